@@ -1,131 +1,175 @@
 ## Importing libraries and files
 import os
+import logging
+from functools import lru_cache
 from dotenv import load_dotenv
 load_dotenv()
 
-from crewai import Agent, LLM
+from crewai import Agent
+from llm_utils import CachedLLM  # Response cache + prompt coalescing + shared RPM/TPM limiter
 
-# Try multiple API providers
-openai_key = os.getenv("OPENAI_API_KEY")
-gemini_key = os.getenv("GEMINI_API_KEY")
-perplexity_key = os.getenv("PERPLEXITY_API_KEY")
+# The LLM and the agents are built on first use, not at import time,
+# so importing this module (tests, worker reloads) costs no provider handshake.
 
-if perplexity_key:
-    # Perplexity configuration
-    llm = LLM(
-        model="perplexity/sonar-pro",  # or "perplexity/sonar" for faster/cheaper
-        temperature=0.1,
-        api_key=perplexity_key
-    )
-    print(" Using Perplexity Sonar Pro")
-elif openai_key:
-    llm = LLM(
-        model="gpt-4o-mini",
-        temperature=0.1,
-        api_key=openai_key
-    )
-    print(" Using OpenAI GPT-4o-mini")
-elif gemini_key:
-    llm = LLM(
-        model="gemini/gemini-1.5-flash",
+# Backstories are sent on every LLM turn, so they stay at ~2 short sentences of
+# role + constraints. CrewAI places them right after the role at the start of the
+# system prompt, which keeps that prefix identical across calls for prompt caching.
+
+logger = logging.getLogger(__name__)
+
+# Search-backed answers go stale; cache them for a limited time only
+SEARCH_CACHE_TTL = int(os.getenv("LLM_SEARCH_CACHE_TTL", "3600"))
+
+# Agent and crew console output is off unless CREW_VERBOSE=1; verbose logging slows every turn
+CREW_VERBOSE = os.getenv("CREW_VERBOSE") == "1"
+
+@lru_cache(maxsize=1)
+def _select_provider():
+    """Pick the first configured provider once per process. Returns (model, api_key)."""
+    # Try multiple API providers
+    openai_key = os.getenv("OPENAI_API_KEY")
+    gemini_key = os.getenv("GEMINI_API_KEY")
+    perplexity_key = os.getenv("PERPLEXITY_API_KEY")
+
+    if perplexity_key:
+        # Perplexity configuration
+        logger.info("Using Perplexity Sonar Pro")
+        return "perplexity/sonar-pro", perplexity_key  # or "perplexity/sonar" for faster/cheaper
+    elif openai_key:
+        logger.info("Using OpenAI GPT-4o-mini")
+        return "gpt-4o-mini", openai_key
+    elif gemini_key:
+        logger.info("Using Google Gemini")
+        return "gemini/gemini-1.5-flash", gemini_key
+    else:
+        raise ValueError("No valid API key found. Please set PERPLEXITY_API_KEY, OPENAI_API_KEY, or GEMINI_API_KEY in .env")
+
+@lru_cache(maxsize=None)
+def get_llm(cache_ttl: int = None):
+    """
+    Build the shared LLM once per cache policy.
+
+    Args:
+        cache_ttl (int): Max age in seconds of reused cached responses; None never expires.
+    """
+    model, api_key = _select_provider()
+    return CachedLLM(
+        model=model,
         temperature=0.1,
-        api_key=gemini_key
+        api_key=api_key,
+        stream=True,  # Emits token chunks for /analyze-stream; full text is still returned
+        cache_ttl=cache_ttl
     )
-    print(" Using Google Gemini")
-else:
-    raise ValueError("No valid API key found. Please set PERPLEXITY_API_KEY, OPENAI_API_KEY, or GEMINI_API_KEY in .env")
 
 # Import tool instances (not classes)
 from tools import search_tool, read_data_tool, analyze_investment_tool, create_risk_assessment_tool
 
 # Creating an Experienced Financial Analyst agent
-financial_analyst = Agent (
-    role="Senior Financial Analyst",
-    goal="Provide comprehensive and accurate financial analysis based on the user's query: {query}",
-    verbose=True,#Show detailed logs (agent's thinking process) 
-    # False: only final output is shown
-    memory=True,
-    #True: Agent remembers previous interactions
-    #False: Each interaction is independent
-    backstory=(
-        "You are a seasoned financial analyst with over 15 years of experience in analyzing "
-        "corporate financial statements, investment opportunities, and market trends. "
-        "You have a deep understanding of financial ratios, cash flow analysis, and risk assessment. "
-        "You provide evidence-based insights and recommendations while being transparent about "
-        "any limitations or assumptions in your analysis. You always consider regulatory compliance "
-        "and best practices in financial analysis."
-    ),
-    tools=[read_data_tool],  # List of tools this agent can use
-    llm=llm,
-    max_iter=3,  # Agent can think → act → think → act → think → act (3 cycles), preventing infinite loops
-    max_rpm=10,
-    allow_delegation=True  # True: Can ask other agents for help | False: Works independently
-)
+@lru_cache(maxsize=1)
+def get_financial_analyst() -> Agent:
+    """Senior financial analyst; answers the user's query."""
+    return Agent(
+        role="Senior Financial Analyst",
+        goal="Provide comprehensive and accurate financial analysis based on the user's query: {query}",
+        verbose=CREW_VERBOSE,#True shows detailed logs (agent's thinking process)
+        memory=False,
+        #False: Each task starts from a clean context; the orchestrator passes
+        #forward a small JSON summary instead (see task.build_shared_context)
+        backstory=(
+            "Financial analyst with 15 years of experience in statements, ratios and cash flow. "
+            "Give evidence-based insights and state every assumption or data gap."
+        ),
+        tools=[read_data_tool],  # List of tools this agent can use
+        llm=get_llm(),
+        max_iter=3,  # Agent can think → act → think → act → think → act (3 cycles), preventing infinite loops
+        max_rpm=10,
+        allow_delegation=False  # Runs in parallel with the advisor/assessor, so it must not block on them
+    )
 
 # Creating a document verifier agent
-verifier = Agent(
-    role="Financial Document Verifier",
-    goal="Thoroughly verify and validate financial documents to ensure data accuracy and completeness",
-    verbose=True,
-    memory=True,
-    backstory=(
-        "You are a meticulous document verification specialist with expertise in financial reporting "
-        "standards and regulatory compliance. You carefully examine documents to ensure they contain "
-        "valid financial data, proper formatting, and meet industry standards. You identify any "
-        "inconsistencies, missing information, or potential data quality issues that could affect "
-        "the reliability of subsequent analysis."
-    ),
-    tools=[read_data_tool],
-    llm=llm,
-    max_iter=2,
-    max_rpm=10,
-    allow_delegation=True
-)
+@lru_cache(maxsize=1)
+def get_verifier() -> Agent:
+    """Checks that the document is readable and contains financial data."""
+    return Agent(
+        role="Financial Document Verifier",
+        goal="Thoroughly verify and validate financial documents to ensure data accuracy and completeness",
+        verbose=CREW_VERBOSE,
+        memory=False,
+        backstory=(
+            "Financial reporting compliance specialist. "
+            "Confirm the document holds valid financial data and flag gaps or inconsistencies."
+        ),
+        tools=[read_data_tool],
+        llm=get_llm(),
+        max_iter=2,
+        max_rpm=10,
+        allow_delegation=False  # Its report reaches later agents via the shared context, not delegation
+    )
 
-investment_advisor = Agent(
-    role="Investment Strategy Advisor",
-    goal="Provide sound investment recommendations based on thorough analysis of financial data and market conditions",
-    verbose=True,
-    memory=True,
-    backstory=(
-        "You are a certified financial planner (CFP) with 20+ years of experience in investment "
-        "management and portfolio construction. You specialize in translating financial analysis "
-        "into actionable investment strategies while considering risk tolerance, diversification, "
-        "and long-term financial goals. You always provide disclaimers about investment risks "
-        "and the importance of consulting with qualified professionals before making investment decisions."
-    ),
-    tools=[read_data_tool, analyze_investment_tool, search_tool],
-    llm=llm,
-    max_iter=3,
-    max_rpm=10,
-    allow_delegation=False
-)
+@lru_cache(maxsize=1)
+def get_investment_advisor() -> Agent:
+    """Turns the analysis into investment recommendations."""
+    return Agent(
+        role="Investment Strategy Advisor",
+        goal="Provide sound investment recommendations based on thorough analysis of financial data and market conditions",
+        verbose=CREW_VERBOSE,
+        memory=False,
+        backstory=(
+            "Certified financial planner with 20 years of portfolio experience. "
+            "Give actionable, risk-aware recommendations with investment-risk disclaimers."
+        ),
+        tools=[read_data_tool, analyze_investment_tool, search_tool],
+        llm=get_llm(cache_ttl=SEARCH_CACHE_TTL),  # Prompts include web search results
+        max_iter=2,
+        max_rpm=10,
+        allow_delegation=False
+    )
 
-risk_assessor = Agent(
-    role="Risk Assessment Specialist",
-    goal="Conduct comprehensive risk analysis and provide balanced risk-return assessments",
-    verbose=True,
-    memory=True,
-    backstory=(
-        "You are a risk management expert with deep expertise in quantitative risk analysis, "
-        "stress testing, and scenario modeling. You evaluate various types of financial risks "
-        "including market risk, credit risk, liquidity risk, and operational risk. You provide "
-        "balanced assessments that help stakeholders understand both potential opportunities "
-        "and threats, always emphasizing the importance of proper risk management frameworks."
-    ),
-    tools=[read_data_tool, create_risk_assessment_tool, search_tool],
-    llm=llm,
-    max_iter=3,
-    max_rpm=10,
-    allow_delegation=False
-)
+@lru_cache(maxsize=1)
+def get_risk_assessor() -> Agent:
+    """Identifies and grades financial risks."""
+    return Agent(
+        role="Risk Assessment Specialist",
+        goal="Conduct comprehensive risk analysis and provide balanced risk-return assessments",
+        verbose=CREW_VERBOSE,
+        memory=False,
+        backstory=(
+            "Risk management expert in market, credit, liquidity and operational risk. "
+            "Give balanced assessments with clear severity levels and mitigations."
+        ),
+        tools=[read_data_tool, create_risk_assessment_tool, search_tool],
+        llm=get_llm(cache_ttl=SEARCH_CACHE_TTL),  # Prompts include web search results
+        max_iter=3,
+        max_rpm=10,
+        allow_delegation=False
+    )
+
+# Merges the verifier, analyst, investment and risk reports into one final report
+@lru_cache(maxsize=1)
+def get_synthesizer() -> Agent:
+    """Merges the specialist reports into the final report."""
+    return Agent(
+        role="Lead Financial Report Editor",
+        goal="Combine the specialist reports into a single, consistent financial analysis that answers the user's query: {query}",
+        verbose=CREW_VERBOSE,
+        memory=False,
+        backstory=(
+            "Senior research editor who merges specialist reports into one. "
+            "Resolve contradictions and add no facts the specialists did not provide."
+        ),
+        tools=[],  # Works only from the reports handed to it
+        llm=get_llm(),
+        max_iter=2,
+        max_rpm=10,
+        allow_delegation=False
+    )
 
 """# Creating a Tax Analyst agent
 tax_analyst = Agent(
     role="Senior Tax Analyst",
     goal="Analyze tax implications and provide tax optimization strategies based on financial data from: {query}",
     verbose=True,
-    memory=True,
+    memory=False,
     backstory=(
         "You are a certified public accountant (CPA) with 18+ years of experience in corporate taxation, "
         "tax planning, and compliance. You specialize in identifying tax liabilities, deductions, credits, "
@@ -134,7 +178,7 @@ tax_analyst = Agent(
         "You always emphasize the importance of consulting with qualified tax professionals for specific tax advice."
     ),
     tools=[read_data_tool, search_tool],  # Can read documents and search for tax law updates
-    llm=llm,
+    llm=get_llm(),
     max_iter=3,
     max_rpm=10,
     allow_delegation=False  # Tax analysis is specialized, works independently
@@ -1,18 +1,57 @@
 """
 Database models and connection for storing financial analysis results
 """
-from sqlalchemy import create_engine, Column, String, Text, DateTime, Integer
+from sqlalchemy import create_engine, event, Column, String, Text, DateTime, Integer, JSON, Index, select, update, delete, func, case, literal_column
+from sqlalchemy.pool import StaticPool
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from datetime import datetime
+from sqlalchemy.orm import sessionmaker, synonym, Session
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any
+import os
 import uuid
+import re
+
+# Create SQLite database (DATABASE_URL=sqlite:///:memory: gives a throwaway one, e.g. for tests)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./financial_analysis.db")
+
+if DATABASE_URL in ("sqlite://", "sqlite:///:memory:"):
+    # An in-memory database only exists on its single connection
+    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+else:
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=10,
+        max_overflow=20
+    )
+
+# WAL lets readers run alongside the writer; NORMAL sync is safe under WAL and skips most fsyncs
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+    cursor.close()
 
-# Create SQLite database
-DATABASE_URL = "sqlite:///./financial_analysis.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Optional: async engine for the API's hot paths (needs aiosqlite); queue workers keep the sync engine
+try:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    async_engine = create_async_engine(DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1))
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+    ASYNC_DATABASE_AVAILABLE = True
+except ImportError:
+    AsyncSessionLocal = None
+    ASYNC_DATABASE_AVAILABLE = False
 Base = declarative_base()
 
+# Rendered inline (not as a bound parameter) so queries match the functional index expression
+RECOMMENDATION_PATH = literal_column("'$.recommendation'")
+
 # Database Model
 class AnalysisResult(Base):
     __tablename__ = "analysis_results"
@@ -26,9 +65,105 @@ class AnalysisResult(Base):
     risk_assessment = Column(Text, nullable=True)
     full_result = Column(Text, nullable=False)
     status = Column(String, default="completed")
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     processing_time = Column(Integer, nullable=True)  # seconds
 
+    # Request metadata used by the API (bonus_main.py)
+    original_filename = Column(String, nullable=True)
+    file_size = Column(Integer, nullable=True)
+    user_ip = Column(String, nullable=True)
+    job_id = Column(String, nullable=True)
+    analysis_type = Column(String, default="comprehensive")
+    error_message = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Structured fields pulled from the report, e.g. {"recommendation": "BUY", "risk_level": "MEDIUM"}
+    extracted_metrics = Column(JSON, nullable=True)
+
+    # The API calls the stored report analysis_result
+    analysis_result = synonym("full_result")
+
+    __table_args__ = (
+        # History lookups filter by user_ip and order by newest first
+        Index("ix_analysis_user_created", user_ip, created_at.desc()),
+        # Analytics filter on the recommendation without parsing report text
+        Index("ix_analysis_recommendation", func.json_extract(extracted_metrics, RECOMMENDATION_PATH)),
+    )
+
+# Which column each agent's output is stored in (matched on the agent role)
+SECTION_BY_ROLE = {
+    "Financial Document Verifier": "verification_result",
+    "Senior Financial Analyst": "financial_analysis",
+    "Investment Strategy Advisor": "investment_analysis",
+    "Risk Assessment Specialist": "risk_assessment",
+}
+
+# Attribute names on main.AnalysisReport
+SECTION_BY_ATTRIBUTE = {
+    "verification": "verification_result",
+    "financial_analysis": "financial_analysis",
+    "investment_analysis": "investment_analysis",
+    "risk_assessment": "risk_assessment",
+}
+
+# Only the labelled field counts ("Recommendation: Buy", optionally in bold); a report
+# that merely mentions buying or selling gets no recommendation (NULL)
+_RECOMMENDATION_RE = re.compile(
+    r"\brecommendation[*\s]*[:\-][*\s]*(strong buy|buy|hold|sell|strong sell)\b", re.IGNORECASE
+)
+_RISK_LEVEL_RE = re.compile(r"\b(low-medium|low|medium|high)\s+risk\b", re.IGNORECASE)
+
+def split_report_sections(report) -> Dict[str, str]:
+    """
+    Split a crew result into the per-agent columns of AnalysisResult.
+
+    Accepts main.AnalysisReport, a CrewOutput (sections matched by agent role),
+    or plain text (no sections).
+    """
+    sections = {}
+    for attribute, column in SECTION_BY_ATTRIBUTE.items():
+        value = getattr(report, attribute, None)
+        if isinstance(value, str):
+            sections[column] = value
+    for task_output in getattr(report, "tasks_output", None) or []:
+        column = SECTION_BY_ROLE.get(getattr(task_output, "agent", None))
+        if column:
+            sections[column] = str(task_output.raw)
+    return sections
+
+def extract_metrics(sections: Dict[str, str]) -> Dict[str, Any]:
+    """Pull the recommendation and headline risk level out of the report sections"""
+    metrics = {}
+    recommendation = _RECOMMENDATION_RE.search(sections.get("investment_analysis") or "")
+    if recommendation:
+        metrics["recommendation"] = recommendation.group(1).upper()
+    risk_level = _RISK_LEVEL_RE.search(sections.get("risk_assessment") or "")
+    if risk_level:
+        metrics["risk_level"] = risk_level.group(1).upper()
+    return metrics
+
+def apply_report(analysis: AnalysisResult, report, sections: Dict[str, str] = None):
+    """Store the full report plus its sections and extracted metrics on a row.
+
+    `sections` sets section columns explicitly, e.g. when one is filled in later.
+    """
+    analysis.full_result = str(report)
+    for column, text in {**split_report_sections(report), **(sections or {})}.items():
+        setattr(analysis, column, text)
+    # Metrics come from every section on the row, including ones stored earlier
+    analysis.extracted_metrics = extract_metrics(
+        {column: getattr(analysis, column) for column in SECTION_BY_ATTRIBUTE.values()}
+    ) or None
+
+# LLM response cache, keyed by SHA-256 of (model, temperature, messages)
+class LLMCache(Base):
+    __tablename__ = "llm_cache"
+
+    prompt_hash = Column(String(64), primary_key=True)  # Primary key doubles as the lookup index
+    model = Column(String, nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 # Create tables
 def init_db():
     Base.metadata.create_all(bind=engine)
@@ -43,45 +178,307 @@ def get_db():
         db.close()
 
 # Save analysis to database
-def save_analysis(filename: str, query: str, result: str, processing_time: int = None):
-    """Save analysis result to database"""
-    db = SessionLocal()
+def save_analysis(db: Session, filename: str, query: str, result: str, processing_time: int = None):
+    """Save analysis result to database using the caller's session"""
     try:
+        # The ID is generated here, so no SELECT is needed after the INSERT to read it back
+        analysis_id = str(uuid.uuid4())
         analysis = AnalysisResult(
+            id=analysis_id,
             filename=filename,
             query=query,
-            full_result=str(result),
             processing_time=processing_time
         )
+        apply_report(analysis, result)
         db.add(analysis)
         db.commit()
-        db.refresh(analysis)
-        print(f" Analysis saved to database with ID: {analysis.id}")
-        return analysis.id
+        print(f" Analysis saved to database with ID: {analysis_id}")
+        return analysis_id
     except Exception as e:
         print(f"Error saving to database: {e}")
         db.rollback()
         return None
-    finally:
-        db.close()
 
 # Get all analyses
-def get_all_analyses(limit: int = 50):
+def get_all_analyses(db: Session, limit: int = 50):
     """Get all analysis results"""
+    return db.query(AnalysisResult).order_by(AnalysisResult.created_at.desc()).limit(limit).all()
+
+# Get analysis by ID
+def get_analysis_by_id(db: Session, analysis_id: str):
+    """Get specific analysis by ID"""
+    return db.query(AnalysisResult).filter(AnalysisResult.id == analysis_id).first()
+
+# Create only the LLM cache table (used by processes that never call init_db)
+def init_llm_cache():
+    LLMCache.__table__.create(bind=engine, checkfirst=True)
+
+# Look up a cached LLM response
+def get_cached_response(prompt_hash: str, max_age_seconds: Optional[int] = None) -> Optional[str]:
+    """Return the cached response for a prompt hash, or None on a miss or expired entry"""
     db = SessionLocal()
     try:
-        return db.query(AnalysisResult).order_by(AnalysisResult.created_at.desc()).limit(limit).all()
+        entry = db.get(LLMCache, prompt_hash)
+        if entry is None:
+            return None
+        if max_age_seconds is not None and entry.created_at < datetime.utcnow() - timedelta(seconds=max_age_seconds):
+            return None
+        return entry.response
+    except Exception as e:
+        print(f"Error reading LLM cache: {e}")
+        return None
     finally:
         db.close()
 
-# Get analysis by ID
-def get_analysis_by_id(analysis_id: str):
-    """Get specific analysis by ID"""
+# Store an LLM response
+def save_cached_response(prompt_hash: str, model: str, response: str):
+    """Insert or refresh a cached LLM response"""
     db = SessionLocal()
     try:
-        return db.query(AnalysisResult).filter(AnalysisResult.id == analysis_id).first()
+        db.merge(LLMCache(prompt_hash=prompt_hash, model=model, response=response, created_at=datetime.utcnow()))
+        db.commit()
+    except Exception as e:
+        print(f"Error writing LLM cache: {e}")
+        db.rollback()
     finally:
         db.close()
 
+# Rows removed per DELETE statement in cleanup_old_records
+CLEANUP_BATCH_SIZE = 10000
+
+# Database operations used by the API endpoints
+def history_projection(user_ip: str = None, limit: int = 10, offset: int = 0):
+    """SELECT of the columns shown in the analysis history, newest first"""
+    return select(
+                AnalysisResult.id,
+                AnalysisResult.original_filename,
+                AnalysisResult.query,
+                AnalysisResult.created_at,
+                AnalysisResult.status,
+                AnalysisResult.analysis_type,
+                AnalysisResult.processing_time
+           )\
+           .where(AnalysisResult.user_ip == user_ip)\
+           .order_by(AnalysisResult.created_at.desc())\
+           .limit(limit)\
+           .offset(offset)
+
+class DatabaseOperations:
+
+    @staticmethod
+    def create_analysis_result(
+        db: Session,
+        filename: str,
+        query: str,
+        analysis_result: str,
+        status: str = "processing",
+        original_filename: str = None,
+        file_size: int = None,
+        user_ip: str = None,
+        job_id: str = None,
+        analysis_type: str = "comprehensive"
+    ) -> str:
+        """Create a new analysis record and return its ID (generated client-side, no refresh needed)"""
+        result_id = str(uuid.uuid4())
+        result = AnalysisResult(
+            id=result_id,
+            filename=filename,
+            original_filename=original_filename,
+            file_size=file_size,
+            query=query,
+            analysis_result=analysis_result,
+            status=status,
+            user_ip=user_ip,
+            job_id=job_id,
+            analysis_type=analysis_type
+        )
+        db.add(result)
+        db.commit()
+        return result_id
+
+    @staticmethod
+    def update_analysis_status(
+        db: Session,
+        result_id: str,
+        status: str,
+        analysis_result=None,
+        error_message: str = None,
+        processing_time: float = None,
+        sections: Dict[str, str] = None
+    ) -> Optional[AnalysisResult]:
+        """Update the status (and optionally the result or error) of an analysis.
+
+        analysis_result may be the crew result itself; its sections are stored separately.
+        """
+        result = db.get(AnalysisResult, result_id)
+        if result is None:
+            return None
+        result.status = status
+        if analysis_result is not None:
+            apply_report(result, analysis_result, sections)
+        if error_message is not None:
+            result.error_message = error_message
+        if processing_time is not None:
+            result.processing_time = processing_time
+        db.commit()
+        return result
+
+    @staticmethod
+    def finalize_analysis(
+        db: Session,
+        result_id: str,
+        status: str,
+        analysis_result,
+        processing_time: float = None
+    ) -> bool:
+        """Store a finished analysis with one UPDATE statement, without loading the row first.
+
+        Returns:
+            bool: False if no row has that ID
+        """
+        sections = split_report_sections(analysis_result)
+        values = {
+            "status": status,
+            "full_result": str(analysis_result),
+            "processing_time": processing_time,
+            "extracted_metrics": extract_metrics(sections) or None,
+            **sections,
+        }
+        rowcount = db.execute(
+            update(AnalysisResult).where(AnalysisResult.id == result_id).values(**values)
+        ).rowcount
+        db.commit()
+        return rowcount > 0
+
+    @staticmethod
+    def get_analysis_result(db: Session, result_id: str) -> Optional[AnalysisResult]:
+        """Get a single analysis by ID"""
+        return db.get(AnalysisResult, result_id)
+
+    @staticmethod
+    def get_analysis_results_by_session(
+        db: Session,
+        user_ip: str = None,
+        limit: int = 10,
+        offset: int = 0
+    ) -> List[AnalysisResult]:
+        """Get a page of analyses for one client, newest first (served by ix_analysis_user_created)"""
+        return db.query(AnalysisResult)\
+                 .filter(AnalysisResult.user_ip == user_ip)\
+                 .order_by(AnalysisResult.created_at.desc())\
+                 .limit(limit)\
+                 .offset(offset)\
+                 .all()
+
+    @staticmethod
+    def list_analysis_projection(
+        db: Session,
+        user_ip: str = None,
+        limit: int = 10,
+        offset: int = 0
+    ) -> List[tuple]:
+        """Like get_analysis_results_by_session, but selects only the history columns as plain rows.
+
+        Rows are (id, original_filename, query, created_at, status, analysis_type, processing_time).
+        """
+        return db.execute(history_projection(user_ip, limit, offset)).all()
+
+    @staticmethod
+    def get_system_stats(db: Session) -> Dict[str, Any]:
+        """Aggregate counts for /system-stats, computed in one pass over the table"""
+        def count_where(condition):
+            return func.sum(case((condition, 1), else_=0))
+
+        row = db.execute(
+            select(
+                func.count().label("total"),
+                count_where(AnalysisResult.created_at >= datetime.utcnow() - timedelta(days=7)).label("recent"),
+                count_where(AnalysisResult.status == "completed").label("successful"),
+                count_where(AnalysisResult.status == "failed").label("failed"),
+                func.avg(AnalysisResult.processing_time).label("average_processing_time"),
+            ).select_from(AnalysisResult)
+        ).one()
+        # SUM() is NULL on an empty table
+        total_analyses = row.total
+        successful_analyses = row.successful or 0
+        return {
+            "total_analyses": total_analyses,
+            "recent_analyses_7days": row.recent or 0,
+            "successful_analyses": successful_analyses,
+            "failed_analyses": row.failed or 0,
+            "success_rate": (successful_analyses / max(total_analyses, 1)) * 100,
+            "average_processing_time": row.average_processing_time,
+        }
+
+    @staticmethod
+    def count_recommendations(db: Session, recommendation: str, days: int = 7) -> int:
+        """Count analyses with a given recommendation (e.g. "BUY") in the last `days` days"""
+        return db.execute(
+            select(func.count()).select_from(AnalysisResult).where(
+                func.json_extract(AnalysisResult.extracted_metrics, RECOMMENDATION_PATH) == recommendation.upper(),
+                AnalysisResult.created_at >= datetime.utcnow() - timedelta(days=days)
+            )
+        ).scalar()
+
+    @staticmethod
+    def _delete_in_batches(db: Session, model, key_column, condition) -> int:
+        """DELETE matching rows CLEANUP_BATCH_SIZE at a time; returns the total deleted"""
+        deleted = 0
+        while True:
+            batch = select(key_column).where(condition).limit(CLEANUP_BATCH_SIZE)
+            count = db.execute(
+                delete(model).where(key_column.in_(batch)).execution_options(synchronize_session=False)
+            ).rowcount
+            # A short transaction per batch keeps the WAL write lock brief
+            db.commit()
+            deleted += count
+            if count < CLEANUP_BATCH_SIZE:
+                return deleted
+
+    @staticmethod
+    def cleanup_old_records(db: Session, days_old: int = 30) -> Dict[str, int]:
+        """Delete analyses and cached LLM responses older than `days_old` days"""
+        cutoff = datetime.utcnow() - timedelta(days=days_old)
+        try:
+            return {
+                "analysis_results_deleted": DatabaseOperations._delete_in_batches(
+                    db, AnalysisResult, AnalysisResult.id, AnalysisResult.created_at < cutoff
+                ),
+                "llm_cache_deleted": DatabaseOperations._delete_in_batches(
+                    db, LLMCache, LLMCache.prompt_hash, LLMCache.created_at < cutoff
+                ),
+            }
+        except Exception:
+            db.rollback()
+            raise
+
+class AsyncDatabaseOperations:
+    """AsyncSession versions of the DatabaseOperations used on the API's hot paths"""
+
+    @staticmethod
+    async def create_analysis_result(db: "AsyncSession", **fields) -> str:
+        """Async create_analysis_result; takes the same keyword arguments"""
+        result_id = str(uuid.uuid4())
+        fields.setdefault("status", "processing")
+        fields.setdefault("analysis_type", "comprehensive")
+        db.add(AnalysisResult(id=result_id, **fields))
+        await db.commit()
+        return result_id
+
+    @staticmethod
+    async def list_analysis_projection(
+        db: "AsyncSession",
+        user_ip: str = None,
+        limit: int = 10,
+        offset: int = 0
+    ) -> List[tuple]:
+        """Async list_analysis_projection"""
+        return (await db.execute(history_projection(user_ip, limit, offset))).all()
+
+# Get async database session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 if __name__ == "__main__":
     init_db()
\ No newline at end of file
@@ -1,29 +1,48 @@
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Depends, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Depends, Request, BackgroundTasks
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
+import anyio
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 import os
-import uuid
+import secrets
 import asyncio
-from typing import Optional
+import hashlib
+import tempfile
+import aiofiles
+import aiofiles.os
+from typing import Optional, Tuple
 import logging
 import time
+import threading
 from pathlib import Path
-from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from collections import deque
+from datetime import datetime
 
 from crewai import Crew, Process
-from agents import financial_analyst, verifier
-from task import analyze_financial_document, verification
+from agents import get_financial_analyst, get_verifier, CREW_VERBOSE
+from task import get_analyze_financial_document, get_verification, build_shared_context
 
 # Import bonus features (optional - will work without them)
 try:
-    from database import DatabaseOperations, get_db, init_db
+    from database import (
+        DatabaseOperations, AsyncDatabaseOperations, SessionLocal, AsyncSessionLocal,
+        ASYNC_DATABASE_AVAILABLE, engine, get_db, init_db
+    )
     DATABASE_AVAILABLE = True
 except ImportError:
     print("Database features not available - install SQLAlchemy dependencies")
     DATABASE_AVAILABLE = False
 
 try:
-    from redis_queue import queue_financial_analysis, get_job_status, get_queue_stats
+    from redis_queue import (
+        queue_financial_analyses, queue_risk_assessment, get_queue_stats,
+        get_job_status_async, get_queue_stats_async,
+        crew_cache_key, get_cached_crew_result, cache_crew_result
+    )
     QUEUE_AVAILABLE = True
 except ImportError:
     print("Queue features not available - install Redis and RQ dependencies")
@@ -33,39 +52,267 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(
-    title="Financial Document Analyzer",
-    description="AI-powered financial document analysis system with queue and database support",
-    version="2.0.0"
-)
+# Crew console output is off unless CREW_VERBOSE=1 (see agents.py); runs are traced to TRACE_BUFFER instead
+TRACE_BUFFER = deque(maxlen=1000)
+
+def record_trace(agent: str, trace_event: str, latency_ms: float):
+    """Append one crew event to the in-memory trace served by /debug/trace"""
+    TRACE_BUFFER.append({
+        "ts": datetime.utcnow().isoformat(),
+        "agent": agent,
+        "event": trace_event,
+        "latency_ms": round(latency_ms, 1)
+    })
+
+# Enqueue micro-batching for /analyze(-async)
+ENQUEUE_BATCH_WINDOW = 0.01  # 10ms
+ENQUEUE_BATCH_MAX_SIZE = 32
+
+# Query used when the client sends none
+DEFAULT_QUERY = "Provide a comprehensive analysis of this financial document"
+
+# Worker threads available for blocking crew runs
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+
+# API keys are read once; they don't change while the server runs
+OPENAI_CONFIGURED = bool(os.getenv("OPENAI_API_KEY"))
+SEARCH_CONFIGURED = bool(os.getenv("SERPER_API_KEY"))
+
+# /health responses are reused for this many seconds
+HEALTH_CACHE_SECONDS = 5
+
+# How long /analyze?wait=true blocks before returning the job instead
+JOB_WAIT_TIMEOUT = 300
 
-def run_crew(query: str, file_path: str = "data/sample.pdf"):
-    """Run the financial analysis crew"""
+# Upload limits
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10MB
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+PDF_MAGIC = b"%PDF-"
+
+async def save_upload(file: UploadFile, file_path: str) -> Tuple[int, str]:
+    """
+    Stream an upload to disk in fixed-size chunks instead of reading it into memory
+    
+    Args:
+        file: Uploaded file
+        file_path: Destination path
+        
+    Returns:
+        Number of bytes written and their SHA-256 hex digest
+    """
+    # Rewind so a handler falling back to another one can save the same upload again
+    await file.seek(0)
+    
+    # Check the content, not just the extension, before writing anything
+    header = await file.read(len(PDF_MAGIC))
+    if not header:
+        raise HTTPException(status_code=400, detail="Empty file uploaded")
+    if header != PDF_MAGIC:
+        raise HTTPException(status_code=400, detail="Uploaded file is not a PDF")
+    
+    total = len(header)
+    # Hash while streaming so the crew cache never re-reads the file
+    digest = hashlib.sha256(header)
+    # Write to a temporary name next to the destination; the file only appears under
+    # file_path once complete, and the rename stays on the same filesystem
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or ".", suffix=".pdf.part")
     try:
-        financial_crew = Crew(
-            agents=[verifier, financial_analyst],
-            tasks=[verification, analyze_financial_document],
-            process=Process.sequential,
-            verbose=True
+        async with aiofiles.open(fd, "wb") as f:
+            await f.write(header)
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                total += len(chunk)
+                # Abort oversized uploads without reading the rest of the body
+                if total > MAX_UPLOAD_SIZE:
+                    raise HTTPException(status_code=413, detail="File size must be less than 10MB")
+                digest.update(chunk)
+                await f.write(chunk)
+            if hasattr(os, "posix_fadvise"):
+                # The PDF reader consumes the file front to back
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        # No fsync: uploads are transient inputs, and a crash loses the request anyway
+        await aiofiles.os.replace(tmp_path, file_path)
+    except BaseException:
+        await remove_upload(tmp_path)
+        raise
+    return total, digest.hexdigest()
+
+class LazySession:
+    """Database session that is only opened when a handler first asks for it"""
+    
+    def __init__(self):
+        self._db = None
+    
+    def __call__(self) -> Optional[Session]:
+        if not DATABASE_AVAILABLE:
+            return None
+        if self._db is None:
+            self._db = SessionLocal()
+        return self._db
+    
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+
+def get_db_optional():
+    """Dependency yielding a LazySession, so rejected requests never take a pooled connection"""
+    lazy_db = LazySession()
+    try:
+        yield lazy_db
+    finally:
+        lazy_db.close()
+
+async def remove_upload(file_path: str):
+    """Delete an uploaded file off the event loop, logging instead of raising on failure"""
+    try:
+        await aiofiles.os.remove(file_path)
+        logger.info(f"Cleaned up temporary file: {file_path}")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Could not clean up file {file_path}: {str(e)}")
+
+async def create_record_in_background(record: dict):
+    """Insert an analysis record after the response was sent, in its own session"""
+    try:
+        if ASYNC_DATABASE_AVAILABLE:
+            # Insert without blocking the event loop on disk I/O
+            async with AsyncSessionLocal() as async_db:
+                await AsyncDatabaseOperations.create_analysis_result(async_db, **record)
+        else:
+            def create():
+                db = SessionLocal()
+                try:
+                    DatabaseOperations.create_analysis_result(db=db, **record)
+                finally:
+                    db.close()
+            await run_in_threadpool(create)
+    except Exception as e:
+        logger.warning(f"Could not create database record: {e}")
+
+def finalize_in_background(result_id: str, status: str, analysis_result, processing_time: float):
+    """Store a finished analysis after the response was sent, in its own session"""
+    db = SessionLocal()
+    try:
+        DatabaseOperations.finalize_analysis(
+            db=db,
+            result_id=result_id,
+            status=status,
+            analysis_result=analysis_result,
+            processing_time=processing_time
         )
+    except Exception as e:
+        logger.warning(f"Could not update database record: {e}")
+    finally:
+        db.close()
+
+def run_crew(query: str, file_path: str = "data/sample.pdf", file_hash: str = None):
+    """Run the financial analysis crew (cached per document and query when Redis is available)"""
+    try:
+        cache_key = None
+        if QUEUE_AVAILABLE:
+            cache_key = crew_cache_key(file_path, query, prefix="crew:verified", file_hash=file_hash)
+            cached = get_cached_crew_result(cache_key)
+            if cached is not None:
+                logger.info(f"Crew cache hit for {file_path}")
+                return cached
+        
+        # kickoff() interpolates the tasks in place, so concurrent requests each get a copy
+        financial_crew = getattr(app.state, "crew", None) or build_crew()
+        financial_crew = financial_crew.copy()
         
         # Create context for the crew
+        # The analyst also sees the verification task output directly in this crew
         inputs = {
             'query': query,
-            'file_path': file_path
+            'file_path': file_path,
+            'shared_context': build_shared_context(file_path, query)
         }
         
+        started_at = last_event_at = time.perf_counter()
+        def trace_task(task_output):
+            nonlocal last_event_at
+            now = time.perf_counter()
+            record_trace(task_output.agent, "task_completed", (now - last_event_at) * 1000)
+            last_event_at = now
+        financial_crew.task_callback = trace_task
+        
         result = financial_crew.kickoff(inputs)
+        record_trace("crew", "kickoff_completed", (time.perf_counter() - started_at) * 1000)
+        if cache_key:
+            cache_crew_result(cache_key, str(result))
         return result
         
     except Exception as e:
         logger.error(f"Error running crew: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error in analysis crew: {str(e)}")
 
-# Initialize database on startup (if available)
-@app.on_event("startup")
-async def startup_event():
+class EnqueueBatcher:
+    """
+    Collects enqueue requests from concurrent handlers and sends them to Redis together
+    
+    A batch is flushed ENQUEUE_BATCH_WINDOW seconds after its first request arrived,
+    or as soon as it holds ENQUEUE_BATCH_MAX_SIZE requests.
+    """
+    
+    def __init__(self):
+        self._pending = asyncio.Queue()
+    
+    async def submit(self, **analysis) -> Optional[str]:
+        """Queue one analysis (queue_financial_analyses fields) and wait for its job ID"""
+        future = asyncio.get_running_loop().create_future()
+        await self._pending.put((analysis, future))
+        return await future
+    
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._pending.get()]
+            deadline = loop.time() + ENQUEUE_BATCH_WINDOW
+            while len(batch) < ENQUEUE_BATCH_MAX_SIZE:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._pending.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                job_ids = await run_in_threadpool(queue_financial_analyses, [analysis for analysis, _ in batch])
+            except Exception as e:
+                logger.error(f"Batched enqueue failed: {e}")
+                job_ids = [None] * len(batch)
+            for (_, future), job_id in zip(batch, job_ids):
+                if not future.done():
+                    future.set_result(job_id)
+
+def build_crew() -> Crew:
+    """Verifier + analyst crew served by the API"""
+    return Crew(
+        agents=[get_verifier(), get_financial_analyst()],
+        tasks=[get_verification(), get_analyze_financial_document()],
+        process=Process.sequential,
+        verbose=CREW_VERBOSE  # Verbose output slows every kickoff
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     """Initialize system on startup"""
+    # Crew runs execute in the threadpool so the event loop keeps serving other requests
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    
+    # Agents, tasks and the crew are validated once and reused by every request
+    app.state.crew = build_crew()
+    
+    # Concurrent uploads share Redis round trips when they are queued
+    batcher_task = None
+    if QUEUE_AVAILABLE:
+        app.state.enqueue_batcher = EnqueueBatcher()
+        batcher_task = asyncio.create_task(app.state.enqueue_batcher.run())
+    
     if DATABASE_AVAILABLE:
         try:
             init_db()
@@ -73,9 +320,27 @@ async def startup_event():
         except Exception as e:
             logger.error(f"Database initialization failed: {e}")
     
-    # Ensure data directory exists
+    # Ensure data directory exists (once; request handlers rely on it)
     os.makedirs("data", exist_ok=True)
     logger.info("Financial Document Analyzer started successfully")
+    yield
+    
+    if batcher_task:
+        batcher_task.cancel()
+    if DATABASE_AVAILABLE:
+        _close_probe_connection()
+
+app = FastAPI(
+    title="Financial Document Analyzer",
+    description="AI-powered financial document analysis system with queue and database support",
+    version="2.0.0",
+    lifespan=lifespan,
+    # orjson serializes large report strings faster and handles datetimes natively
+    default_response_class=ORJSONResponse
+)
+
+# Report text is long natural language and compresses several times over
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
 @app.get("/")
 async def root():
@@ -90,49 +355,77 @@ async def root():
         }
     }
 
+# Long-lived connection for health probes, so polling doesn't check one out of the pool each time
+_probe_conn = None
+_probe_lock = threading.Lock()
+
+def _probe_database():
+    """Run SELECT 1 on the probe connection, reconnecting once if it went stale"""
+    global _probe_conn
+    with _probe_lock:
+        for attempt in range(2):
+            try:
+                if _probe_conn is None:
+                    _probe_conn = engine.connect()
+                _probe_conn.execute(text("SELECT 1"))
+                _probe_conn.commit()
+                return
+            except Exception:
+                _close_probe_connection()
+                if attempt:
+                    raise
+
+def _close_probe_connection():
+    global _probe_conn
+    if _probe_conn is not None:
+        try:
+            _probe_conn.close()
+        except Exception:
+            pass
+        _probe_conn = None
+
+@lru_cache(maxsize=1)
+def _health_cached(bucket: int) -> dict:
+    """Compose the health report once per HEALTH_CACHE_SECONDS time bucket, however often it is polled"""
+    # Check if data directory exists
+    data_dir = Path("data")
+    data_dir_exists = data_dir.exists()
+    
+    health_status = {
+        "status": "healthy",
+        "timestamp": datetime.utcnow().isoformat(),
+        "data_directory": data_dir_exists,
+        "openai_configured": OPENAI_CONFIGURED,
+        "search_configured": SEARCH_CONFIGURED,
+        "features": {
+            "database": DATABASE_AVAILABLE,
+            "queue": QUEUE_AVAILABLE
+        }
+    }
+    
+    # Add database health if available
+    if DATABASE_AVAILABLE:
+        try:
+            _probe_database()
+            health_status["database_status"] = "connected"
+        except Exception as e:
+            health_status["database_status"] = f"error: {str(e)}"
+    
+    # Add queue health if available  
+    if QUEUE_AVAILABLE:
+        try:
+            queue_stats = get_queue_stats()
+            health_status["queue_stats"] = queue_stats
+        except Exception as e:
+            health_status["queue_status"] = f"error: {str(e)}"
+    
+    return health_status
+
 @app.get("/health")
 async def health_check():
-    """Detailed health check"""
+    """Detailed health check (cached for HEALTH_CACHE_SECONDS)"""
     try:
-        # Check if data directory exists
-        data_dir = Path("data")
-        data_dir_exists = data_dir.exists()
-        
-        # Check environment variables
-        openai_key_exists = bool(os.getenv("OPENAI_API_KEY"))
-        serper_key_exists = bool(os.getenv("SERPER_API_KEY"))
-        
-        health_status = {
-            "status": "healthy",
-            "timestamp": datetime.utcnow().isoformat(),
-            "data_directory": data_dir_exists,
-            "openai_configured": openai_key_exists,
-            "search_configured": serper_key_exists,
-            "features": {
-                "database": DATABASE_AVAILABLE,
-                "queue": QUEUE_AVAILABLE
-            }
-        }
-        
-        # Add database health if available
-        if DATABASE_AVAILABLE:
-            try:
-                db = next(get_db())
-                # Test database connection
-                db.execute("SELECT 1")
-                health_status["database_status"] = "connected"
-                db.close()
-            except Exception as e:
-                health_status["database_status"] = f"error: {str(e)}"
-        
-        # Add queue health if available  
-        if QUEUE_AVAILABLE:
-            try:
-                queue_stats = get_queue_stats()
-                health_status["queue_stats"] = queue_stats
-            except Exception as e:
-                health_status["queue_status"] = f"error: {str(e)}"
-        
+        health_status = await run_in_threadpool(_health_cached, int(time.time()) // HEALTH_CACHE_SECONDS)
         return health_status
         
     except Exception as e:
@@ -141,15 +434,64 @@ async def health_check():
             content={"status": "unhealthy", "error": str(e)}
         )
 
+async def poll_job(job_id: str) -> dict:
+    """Poll a queued job with exponential backoff (50ms up to 2s) until it finishes or fails"""
+    delay = 0.05
+    while True:
+        status = await get_job_status_async(job_id)
+        if "error" in status and "status" not in status:
+            return status
+        if status["status"] in ("finished", "failed"):
+            return status
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 2.0)
+
 @app.post("/analyze")
 async def analyze_document(
     request: Request,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    query: Optional[str] = Form(default="Provide a comprehensive analysis of this financial document"),
-    db: Session = Depends(get_db) if DATABASE_AVAILABLE else None
+    query: Optional[str] = Form(default=DEFAULT_QUERY),
+    wait: bool = Form(default=False),
+    db_factory: LazySession = Depends(get_db_optional)
+):
+    """
+    Queue a financial document for analysis by the workers
+    
+    Args:
+        file: PDF file to analyze
+        query: Specific question or analysis request
+        wait: Block until the job finishes (up to JOB_WAIT_TIMEOUT seconds)
+        
+    Returns:
+        Job information for status tracking, or the analysis when wait is set
+    """
+    if not QUEUE_AVAILABLE:
+        return await analyze_document_sync(request, file, query, background_tasks, db_factory)
+    
+    queued = await analyze_document_async(request, background_tasks, file, query, "normal", db_factory)
+    if not wait or queued.get("status") != "queued":
+        return queued
+    
+    try:
+        job = await asyncio.wait_for(poll_job(queued["job_id"]), timeout=JOB_WAIT_TIMEOUT)
+    except asyncio.TimeoutError:
+        # Still running; the client can keep polling check_status_url
+        return queued
+    
+    if job.get("status") != "finished":
+        raise HTTPException(status_code=500, detail=f"Error during document analysis: {job.get('error')}")
+    return {**queued, "status": "success", "analysis": job.get("result")}
+
+async def analyze_document_sync(
+    request: Request,
+    file: UploadFile,
+    query: Optional[str],
+    background_tasks: BackgroundTasks,
+    db_factory: LazySession
 ):
     """
-    Analyze financial document and provide comprehensive insights
+    Analyze financial document in the request itself (used when the queue is unavailable)
     
     Args:
         file: PDF file to analyze
@@ -159,27 +501,15 @@ async def analyze_document(
         Analysis results with insights and recommendations
     """
     
-    file_id = str(uuid.uuid4())
+    file_id = secrets.token_hex(16)
     file_path = f"data/financial_document_{file_id}.pdf"
     start_time = time.time()
     user_ip = request.client.host if hasattr(request, 'client') else None
     
-    # Create database record if available
-    db_result = None
-    if DATABASE_AVAILABLE and db:
-        try:
-            db_result = DatabaseOperations.create_analysis_result(
-                db=db,
-                filename=file_path,
-                original_filename=file.filename,
-                file_size=file.size,
-                query=query,
-                analysis_result="Processing...",
-                status="processing",
-                user_ip=user_ip
-            )
-        except Exception as e:
-            logger.warning(f"Could not create database record: {e}")
+    db = None
+    db_result_id = None
+    risk_job_id = None
+    cleanup_scheduled = False
     
     try:
         # Validate file type
@@ -190,22 +520,17 @@ async def analyze_document(
             )
         
         # Validate file size (10MB limit)
-        if file.size and file.size > 10 * 1024 * 1024:
+        if file.size and file.size > MAX_UPLOAD_SIZE:
             raise HTTPException(
-                status_code=400,
+                status_code=413,
                 detail="File size must be less than 10MB"
             )
         
-        # Ensure data directory exists
-        os.makedirs("data", exist_ok=True)
-        
         # Save uploaded file
         try:
-            with open(file_path, "wb") as f:
-                content = await file.read()
-                if not content:
-                    raise HTTPException(status_code=400, detail="Empty file uploaded")
-                f.write(content)
+            _, file_hash = await save_upload(file, file_path)
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -213,41 +538,63 @@ async def analyze_document(
             )
         
         # Validate and clean query
-        if not query or query.strip() == "":
-            query = "Provide a comprehensive analysis of this financial document"
-        query = query.strip()
+        query = (query or "").strip() or DEFAULT_QUERY
         
         logger.info(f"Processing file: {file.filename} with query: {query}")
         
+        # Create database record if available (only once the upload is accepted)
+        db = db_factory()
+        if DATABASE_AVAILABLE and db:
+            try:
+                db_result_id = DatabaseOperations.create_analysis_result(
+                    db=db,
+                    filename=file_path,
+                    original_filename=file.filename,
+                    file_size=file.size,
+                    query=query,
+                    analysis_result="Processing...",
+                    status="processing",
+                    user_ip=user_ip
+                )
+            except Exception as e:
+                logger.warning(f"Could not create database record: {e}")
+        
         # Process the financial document
         try:
-            response = run_crew(query=query, file_path=file_path)
+            response = await run_in_threadpool(run_crew, query, file_path, file_hash)
             processing_time = time.time() - start_time
             
             # Update database record if available
-            if DATABASE_AVAILABLE and db and db_result:
-                try:
-                    DatabaseOperations.update_analysis_status(
-                        db=db,
-                        result_id=db_result.id,
-                        status="completed",
-                        analysis_result=str(response)
+            if DATABASE_AVAILABLE and db and db_result_id:
+                # Risk assessment (slow web look-ups) finishes in a worker that updates this row
+                if QUEUE_AVAILABLE:
+                    try:
+                        # The row must hold the primary result before the worker appends to it
+                        DatabaseOperations.finalize_analysis(
+                            db=db,
+                            result_id=db_result_id,
+                            status="processing_risk",
+                            analysis_result=response,
+                            processing_time=processing_time
+                        )
+                        risk_job_id = queue_risk_assessment(db_result_id, query, file_path)
+                        if not risk_job_id:
+                            DatabaseOperations.update_analysis_status(db, db_result_id, "completed")
+                        
+                    except Exception as e:
+                        logger.warning(f"Could not update database record: {e}")
+                else:
+                    background_tasks.add_task(
+                        finalize_in_background, db_result_id, "completed", response, processing_time
                     )
-                    
-                    # Update processing time
-                    db_result.processing_time = processing_time
-                    db.commit()
-                    
-                except Exception as e:
-                    logger.warning(f"Could not update database record: {e}")
             
         except Exception as e:
             # Update database record with error if available
-            if DATABASE_AVAILABLE and db and db_result:
+            if DATABASE_AVAILABLE and db and db_result_id:
                 try:
                     DatabaseOperations.update_analysis_status(
                         db=db,
-                        result_id=db_result.id,
+                        result_id=db_result_id,
                         status="failed",
                         error_message=str(e)
                     )
@@ -270,8 +617,17 @@ async def analyze_document(
             "processing_time": processing_time
         }
         
-        if DATABASE_AVAILABLE and db_result:
-            response_data["database_id"] = db_result.id
+        if DATABASE_AVAILABLE and db_result_id:
+            response_data["database_id"] = db_result_id
+        
+        if risk_job_id:
+            response_data["status"] = "partial"
+            response_data["risk_assessment_job_id"] = risk_job_id
+            response_data["check_status_url"] = f"/analysis/{db_result_id}"
+        else:
+            # Deleted after the response is sent (the risk assessment job removes it otherwise)
+            background_tasks.add_task(remove_upload, file_path)
+            cleanup_scheduled = True
         
         return response_data
         
@@ -286,21 +642,18 @@ async def analyze_document(
         )
     
     finally:
-        # Clean up uploaded file
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                logger.info(f"Cleaned up temporary file: {file_path}")
-            except Exception as e:
-                logger.warning(f"Could not clean up file {file_path}: {str(e)}")
+        # Background tasks don't run for error responses, so failed requests clean up here
+        if not (risk_job_id or cleanup_scheduled):
+            await remove_upload(file_path)
 
 @app.post("/analyze-async")
 async def analyze_document_async(
     request: Request,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    query: Optional[str] = Form(default="Provide a comprehensive analysis of this financial document"),
+    query: Optional[str] = Form(default=DEFAULT_QUERY),
     priority: str = Form(default="normal"),
-    db: Session = Depends(get_db) if DATABASE_AVAILABLE else None
+    db_factory: LazySession = Depends(get_db_optional)
 ):
     """
     Queue financial document analysis for background processing
@@ -316,9 +669,9 @@ async def analyze_document_async(
     
     if not QUEUE_AVAILABLE:
         # Fallback to synchronous processing
-        return await analyze_document(request, file, query, db)
+        return await analyze_document_sync(request, file, query, background_tasks, db_factory)
     
-    file_id = str(uuid.uuid4())
+    file_id = secrets.token_hex(16)
     file_path = f"data/financial_document_{file_id}.pdf"
     user_ip = request.client.host if hasattr(request, 'client') else None
     
@@ -328,44 +681,37 @@ async def analyze_document_async(
             raise HTTPException(status_code=400, detail="Only PDF files are supported")
         
         # Validate file size (10MB limit)
-        if file.size and file.size > 10 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="File size must be less than 10MB")
-        
-        # Ensure data directory exists
-        os.makedirs("data", exist_ok=True)
+        if file.size and file.size > MAX_UPLOAD_SIZE:
+            raise HTTPException(status_code=413, detail="File size must be less than 10MB")
         
         # Save uploaded file
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            if not content:
-                raise HTTPException(status_code=400, detail="Empty file uploaded")
-            f.write(content)
+        _, file_hash = await save_upload(file, file_path)
         
         # Validate and clean query
-        if not query or query.strip() == "":
-            query = "Provide a comprehensive analysis of this financial document"
-        query = query.strip()
-        
-        # Queue the analysis
-        job_id = queue_financial_analysis(file_path, query, priority)
+        query = (query or "").strip() or DEFAULT_QUERY
+        
+        # Queue the analysis (job metadata goes to Redis in the same round trip)
+        job_id = await app.state.enqueue_batcher.submit(
+            file_path=file_path,
+            query=query,
+            priority=priority,
+            file_hash=file_hash,
+            metadata={"filename": file.filename, "user_ip": user_ip}
+        )
         
         if job_id:
-            # Create database record if available
-            if DATABASE_AVAILABLE and db:
-                try:
-                    db_result = DatabaseOperations.create_analysis_result(
-                        db=db,
-                        filename=file_path,
-                        original_filename=file.filename,
-                        file_size=file.size,
-                        query=query,
-                        analysis_result="Queued for processing...",
-                        status="queued",
-                        user_ip=user_ip,
-                        job_id=job_id
-                    )
-                except Exception as e:
-                    logger.warning(f"Could not create database record: {e}")
+            # Create database record after the response is sent, if available
+            if DATABASE_AVAILABLE:
+                background_tasks.add_task(create_record_in_background, dict(
+                    filename=file_path,
+                    original_filename=file.filename,
+                    file_size=file.size,
+                    query=query,
+                    analysis_result="Queued for processing...",
+                    status="queued",
+                    user_ip=user_ip,
+                    job_id=job_id
+                ))
             
             return {
                 "status": "queued",
@@ -377,19 +723,16 @@ async def analyze_document_async(
                 "estimated_processing_time": "2-5 minutes"
             }
         else:
-            # Queue failed, fallback to synchronous processing
+            # Queue failed, fallback to synchronous processing (it saves the upload again under its own id)
             logger.warning("Queue failed, falling back to synchronous processing")
-            return await analyze_document(request, file, query, db)
+            await remove_upload(file_path)
+            return await analyze_document_sync(request, file, query, background_tasks, db_factory)
             
     except HTTPException:
         raise
     except Exception as e:
         # Clean up file if there was an error
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except:
-                pass
+        await remove_upload(file_path)
         
         logger.error(f"Error in async analysis: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
@@ -397,8 +740,9 @@ async def analyze_document_async(
 @app.post("/analyze-sample")
 async def analyze_sample_document(
     request: Request,
-    query: Optional[str] = Form(default="Provide a comprehensive analysis of this financial document"),
-    db: Session = Depends(get_db) if DATABASE_AVAILABLE else None
+    background_tasks: BackgroundTasks,
+    query: Optional[str] = Form(default=DEFAULT_QUERY),
+    db_factory: LazySession = Depends(get_db_optional)
 ):
     """
     Analyze the sample document in data/sample.pdf
@@ -413,6 +757,8 @@ async def analyze_sample_document(
     sample_path = "data/sample.pdf"
     start_time = time.time()
     user_ip = request.client.host if hasattr(request, 'client') else None
+    db = None
+    db_result_id = None
     
     try:
         # Check if sample file exists
@@ -423,18 +769,16 @@ async def analyze_sample_document(
             )
         
         # Validate and clean query
-        if not query or query.strip() == "":
-            query = "Provide a comprehensive analysis of this financial document"
-        query = query.strip()
+        query = (query or "").strip() or DEFAULT_QUERY
         
         logger.info(f"Processing sample document with query: {query}")
         
         # Create database record if available
-        db_result = None
+        db = db_factory()
         if DATABASE_AVAILABLE and db:
             try:
                 file_size = os.path.getsize(sample_path)
-                db_result = DatabaseOperations.create_analysis_result(
+                db_result_id = DatabaseOperations.create_analysis_result(
                     db=db,
                     filename=sample_path,
                     original_filename="sample.pdf",
@@ -448,24 +792,14 @@ async def analyze_sample_document(
                 logger.warning(f"Could not create database record: {e}")
         
         # Process the sample financial document
-        response = run_crew(query=query, file_path=sample_path)
+        response = await run_in_threadpool(run_crew, query, sample_path)
         processing_time = time.time() - start_time
         
         # Update database record if available
-        if DATABASE_AVAILABLE and db and db_result:
-            try:
-                DatabaseOperations.update_analysis_status(
-                    db=db,
-                    result_id=db_result.id,
-                    status="completed",
-                    analysis_result=str(response)
-                )
-                
-                db_result.processing_time = processing_time
-                db.commit()
-                
-            except Exception as e:
-                logger.warning(f"Could not update database record: {e}")
+        if DATABASE_AVAILABLE and db and db_result_id:
+            background_tasks.add_task(
+                finalize_in_background, db_result_id, "completed", response, processing_time
+            )
         
         response_data = {
             "status": "success",
@@ -476,8 +810,8 @@ async def analyze_sample_document(
             "processing_time": processing_time
         }
         
-        if DATABASE_AVAILABLE and db_result:
-            response_data["database_id"] = db_result.id
+        if DATABASE_AVAILABLE and db_result_id:
+            response_data["database_id"] = db_result_id
         
         return response_data
         
@@ -485,11 +819,11 @@ async def analyze_sample_document(
         raise
     except Exception as e:
         # Update database record with error if available
-        if DATABASE_AVAILABLE and db and db_result:
+        if DATABASE_AVAILABLE and db and db_result_id:
             try:
                 DatabaseOperations.update_analysis_status(
                     db=db,
-                    result_id=db_result.id,
+                    result_id=db_result_id,
                     status="failed",
                     error_message=str(e)
                 )
@@ -502,17 +836,23 @@ async def analyze_sample_document(
             detail=f"Error processing sample document: {str(e)}"
         )
 
+@app.get("/debug/trace")
+async def get_debug_trace(limit: int = 100):
+    """Most recent crew trace events, newest last"""
+    events = list(TRACE_BUFFER)
+    return {"events": events[-limit:], "count": len(events)}
+
 # Queue-related endpoints (available only if queue system is enabled)
 if QUEUE_AVAILABLE:
     @app.get("/job-status/{job_id}")
     async def get_analysis_status(job_id: str):
         """Get the status of a queued analysis job"""
-        return get_job_status(job_id)
+        return await get_job_status_async(job_id)
     
     @app.get("/queue-stats")
     async def get_analysis_queue_stats():
         """Get statistics about analysis queues"""
-        return get_queue_stats()
+        return await get_queue_stats_async()
 
 # Database-related endpoints (available only if database is enabled)
 if DATABASE_AVAILABLE:
@@ -521,26 +861,32 @@ if DATABASE_AVAILABLE:
         request: Request,
         limit: int = 10,
         offset: int = 0,
-        db: Session = Depends(get_db)
+        db_factory: LazySession = Depends(get_db_optional)
     ):
         """Get analysis history for the current user"""
         user_ip = request.client.host if hasattr(request, 'client') else None
-        results = DatabaseOperations.get_analysis_results_by_session(
-            db, user_ip=user_ip, limit=limit, offset=offset
-        )
+        if ASYNC_DATABASE_AVAILABLE:
+            async with AsyncSessionLocal() as async_db:
+                results = await AsyncDatabaseOperations.list_analysis_projection(
+                    async_db, user_ip=user_ip, limit=limit, offset=offset
+                )
+        else:
+            results = DatabaseOperations.list_analysis_projection(
+                db_factory(), user_ip=user_ip, limit=limit, offset=offset
+            )
         
         return {
             "results": [
                 {
-                    "id": r.id,
-                    "filename": r.original_filename,
-                    "query": r.query,
-                    "created_at": r.created_at.isoformat(),
-                    "status": r.status,
-                    "analysis_type": r.analysis_type,
-                    "processing_time": r.processing_time
+                    "id": result_id,
+                    "filename": filename,
+                    "query": query,
+                    "created_at": created_at,
+                    "status": status,
+                    "analysis_type": analysis_type,
+                    "processing_time": processing_time
                 }
-                for r in results
+                for result_id, filename, query, created_at, status, analysis_type, processing_time in results
             ],
             "count": len(results),
             "limit": limit,
@@ -560,8 +906,8 @@ if DATABASE_AVAILABLE:
             "filename": result.original_filename,
             "query": result.query,
             "analysis": result.analysis_result,
-            "created_at": result.created_at.isoformat(),
-            "updated_at": result.updated_at.isoformat(),
+            "created_at": result.created_at,
+            "updated_at": result.updated_at,
             "status": result.status,
             "processing_time": result.processing_time,
             "analysis_type": result.analysis_type,
@@ -572,32 +918,9 @@ if DATABASE_AVAILABLE:
     async def get_system_stats(db: Session = Depends(get_db)):
         """Get system statistics and metrics"""
         try:
-            # Get various system statistics
-            total_analyses = db.query(AnalysisResult).count()
-            recent_analyses = db.query(AnalysisResult)\
-                           .filter(AnalysisResult.created_at >= datetime.utcnow() - timedelta(days=7))\
-                           .count()
-            
-            successful_analyses = db.query(AnalysisResult)\
-                                .filter(AnalysisResult.status == "completed")\
-                                .count()
-            
-            failed_analyses = db.query(AnalysisResult)\
-                            .filter(AnalysisResult.status == "failed")\
-                            .count()
-            
-            # Calculate average processing time
-            avg_processing_time = db.query(func.avg(AnalysisResult.processing_time))\
-                                .filter(AnalysisResult.processing_time.isnot(None))\
-                                .scalar()
-            
+            stats = DatabaseOperations.get_system_stats(db)
             return {
-                "total_analyses": total_analyses,
-                "recent_analyses_7days": recent_analyses,
-                "successful_analyses": successful_analyses,
-                "failed_analyses": failed_analyses,
-                "success_rate": (successful_analyses / max(total_analyses, 1)) * 100,
-                "average_processing_time": avg_processing_time,
+                **stats,
                 "database_status": "connected",
                 "queue_available": QUEUE_AVAILABLE
             }
@@ -5,27 +5,47 @@ This implements Redis Queue (RQ) for background processing of financial document
 """
 
 import os
+import re
+import time
+import uuid
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
 import redis
 from rq import Queue, Worker
 from rq.job import Job
-from typing import Optional, Dict, Any
+from rq.registry import FailedJobRegistry
+from rq.utils import utcparse
+from typing import Optional, Dict, Any, List
 import logging
-from datetime import datetime, timedelta
 
-from main import run_crew
+from main import run_crew, run_risk_crew
+
+# Optional: several worker processes per host (rq>=1.14)
+try:
+    from rq.worker_pool import WorkerPool
+    WORKER_POOL_AVAILABLE = True
+except ImportError:
+    WORKER_POOL_AVAILABLE = False
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Redis connection
+# Upper bound on sockets shared by the API threads and the queues
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 64))
+
+# Redis connection pool: each command borrows a socket, so concurrent requests don't queue on one
 try:
-    redis_conn = redis.Redis(
+    redis_pool = redis.ConnectionPool(
         host=os.getenv('REDIS_HOST', 'localhost'),
         port=int(os.getenv('REDIS_PORT', 6379)),
         db=int(os.getenv('REDIS_DB', 0)),
+        max_connections=REDIS_MAX_CONNECTIONS,
         decode_responses=True
     )
+    redis_conn = redis.Redis(connection_pool=redis_pool)
     # Test connection
     redis_conn.ping()
     logger.info("Redis connection established")
@@ -33,16 +53,171 @@ except Exception as e:
     logger.error(f"Redis connection failed: {e}")
     redis_conn = None
 
+# Optional: non-blocking client for the API's status reads (RQ itself needs the sync client)
+try:
+    import redis.asyncio as aioredis
+    async_redis_conn = aioredis.Redis(
+        connection_pool=aioredis.ConnectionPool(
+            host=os.getenv('REDIS_HOST', 'localhost'),
+            port=int(os.getenv('REDIS_PORT', 6379)),
+            db=int(os.getenv('REDIS_DB', 0)),
+            max_connections=REDIS_MAX_CONNECTIONS,
+            decode_responses=True
+        )
+    ) if redis_conn else None
+except ImportError:
+    async_redis_conn = None
+
+# Redis expires finished and failed jobs on its own after a day
+JOB_RESULT_TTL = 86400
+JOB_FAILURE_TTL = 86400
+
+# Job metadata hashes (job:{job_id}) expire after a day
+JOB_METADATA_TTL = 86400
+
+# Worker processes started by start_worker (one per core by default)
+RQ_NUM_WORKERS = int(os.getenv('RQ_NUM_WORKERS', os.cpu_count() or 1))
+
+# Cached crew results expire after a day
+CREW_CACHE_TTL = int(os.getenv('CREW_CACHE_TTL', 86400))
+
+def crew_cache_key(file_path: str, query: str, prefix: str = "crew", file_hash: str = None) -> str:
+    """
+    Cache key for one analysis: SHA-256 of the document bytes plus the normalized query
+    
+    Args:
+        file_path: Path to the PDF file
+        query: Analysis query
+        prefix: Namespace of the crew producing the result
+        file_hash: SHA-256 of the file if already computed (e.g. while saving the upload)
+    """
+    if file_hash is None:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        file_hash = digest.hexdigest()
+    normalized_query = re.sub(r'\s+', ' ', query).strip().lower()
+    query_hash = hashlib.sha256(normalized_query.encode('utf-8')).hexdigest()
+    return f"{prefix}:{file_hash}:{query_hash}"
+
+def get_cached_crew_result(key: str) -> Optional[str]:
+    """Return a cached crew result, or None on a miss or when Redis is unavailable"""
+    if not redis_conn:
+        return None
+    try:
+        return redis_conn.get(key)
+    except Exception as e:
+        logger.warning(f"Crew cache lookup failed: {e}")
+        return None
+
+def cache_crew_result(key: str, result: str):
+    """Store a crew result for CREW_CACHE_TTL seconds"""
+    if not redis_conn:
+        return
+    try:
+        redis_conn.setex(key, CREW_CACHE_TTL, result)
+    except Exception as e:
+        logger.warning(f"Could not cache crew result: {e}")
+
+def run_cached_crew(query: str, file_path: str, file_hash: str = None) -> str:
+    """
+    Worker job: run the full crew unless the same document and query were analyzed recently
+    
+    Returns:
+        The analysis report text
+    """
+    key = crew_cache_key(file_path, query, file_hash=file_hash)
+    cached = get_cached_crew_result(key)
+    if cached is not None:
+        logger.info(f"Crew cache hit for {os.path.basename(file_path)}")
+        return cached
+    result = str(run_crew(query=query, file_path=file_path))
+    cache_crew_result(key, result)
+    return result
+
 # Create queues for different priority levels
 high_priority_queue = Queue('high_priority', connection=redis_conn) if redis_conn else None
 normal_queue = Queue('analysis', connection=redis_conn) if redis_conn else None
 low_priority_queue = Queue('low_priority', connection=redis_conn) if redis_conn else None
 
+def _select_queue(priority: str) -> Queue:
+    """Queue for a priority level ('high', 'normal' or 'low')"""
+    if priority == 'high':
+        return high_priority_queue
+    elif priority == 'low':
+        return low_priority_queue
+    return normal_queue
+
+def queue_financial_analyses(analyses: List[Dict[str, Any]], timeout: int = 600) -> List[Optional[str]]:
+    """
+    Queue several financial analysis jobs in one Redis round trip
+    
+    Args:
+        analyses: One dict per job with file_path and query, and optionally
+            priority, file_hash and metadata (see queue_financial_analysis)
+        timeout: Job timeout in seconds
+        
+    Returns:
+        Job IDs in the order of `analyses`, or Nones if queueing failed
+    """
+    if not redis_conn:
+        logger.error("Redis not available, falling back to synchronous processing")
+        return [None] * len(analyses)
+    
+    try:
+        job_ids = []
+        jobs_by_queue = {}
+        # Every job, plus its metadata, goes out in one MULTI/EXEC transaction
+        with redis_conn.pipeline(transaction=True) as pipe:
+            for analysis in analyses:
+                file_path = analysis['file_path']
+                # Nanosecond prefix keeps IDs time-ordered; the random suffix avoids same-instant collisions
+                job_id = f"analysis_{time.time_ns()}_{uuid.uuid4().hex[:8]}"
+                job_data = Queue.prepare_data(
+                    run_cached_crew,
+                    kwargs={
+                        'query': analysis['query'],
+                        'file_path': file_path,
+                        'file_hash': analysis.get('file_hash')
+                    },
+                    timeout=timeout,
+                    result_ttl=JOB_RESULT_TTL,
+                    failure_ttl=JOB_FAILURE_TTL,
+                    job_id=job_id
+                )
+                queue = _select_queue(analysis.get('priority', 'normal'))
+                jobs_by_queue.setdefault(queue, []).append(job_data)
+                job_ids.append(job_id)
+                
+                metadata = analysis.get('metadata')
+                if metadata:
+                    metadata_key = f"job:{job_id}"
+                    pipe.hset(metadata_key, mapping={
+                        **{field: str(value) for field, value in metadata.items() if value is not None},
+                        'query': analysis['query'],
+                        'status': 'queued'
+                    })
+                    pipe.expire(metadata_key, JOB_METADATA_TTL)
+            
+            for queue, job_datas in jobs_by_queue.items():
+                queue.enqueue_many(job_datas, pipeline=pipe)
+            pipe.execute()
+        
+        logger.info(f"Queued {len(job_ids)} analysis jobs")
+        return job_ids
+        
+    except Exception as e:
+        logger.error(f"Failed to queue analysis jobs: {e}")
+        return [None] * len(analyses)
+
 def queue_financial_analysis(
     file_path: str, 
     query: str, 
     priority: str = 'normal',
-    timeout: int = 600  # 10 minutes default
+    timeout: int = 600,  # 10 minutes default
+    file_hash: str = None,
+    metadata: Dict[str, Any] = None
 ) -> Optional[str]:
     """
     Queue a financial analysis job
@@ -52,39 +227,165 @@ def queue_financial_analysis(
         query: Analysis query
         priority: 'high', 'normal', or 'low'
         timeout: Job timeout in seconds
+        file_hash: SHA-256 of the file, saves the worker from hashing it again
+        metadata: Request details stored in the job:{job_id} hash for JOB_METADATA_TTL seconds
+        
+    Returns:
+        Job ID if queued successfully, None otherwise
+    """
+    job_id, = queue_financial_analyses([{
+        'file_path': file_path,
+        'query': query,
+        'priority': priority,
+        'file_hash': file_hash,
+        'metadata': metadata
+    }], timeout=timeout)
+    if job_id:
+        logger.info(f"Queued analysis job {job_id} with priority {priority}")
+    return job_id
+
+def run_risk_assessment(analysis_id: str, query: str, file_path: str, cleanup_file: bool = True):
+    """
+    Worker job: run the risk assessor and add its report to an existing analysis row
+    
+    Args:
+        analysis_id: ID of the AnalysisResult row holding the primary analysis
+        query: Analysis query
+        file_path: Path to the PDF file
+        cleanup_file: Delete the uploaded file once the job is done
+    """
+    from database import DatabaseOperations, SessionLocal
+
+    db = SessionLocal()
+    try:
+        risk_report = run_risk_crew(query=query, file_path=file_path)
+        analysis = DatabaseOperations.get_analysis_result(db, analysis_id)
+        primary_report = analysis.full_result if analysis and analysis.full_result else ""
+        DatabaseOperations.update_analysis_status(
+            db=db,
+            result_id=analysis_id,
+            status="completed",
+            analysis_result=f"{primary_report}\n\n=== Risk Assessment ===\n{risk_report}",
+            sections={"risk_assessment": risk_report}
+        )
+        logger.info(f"Risk assessment completed for analysis {analysis_id}")
+    except Exception as e:
+        logger.error(f"Risk assessment failed for analysis {analysis_id}: {e}")
+        DatabaseOperations.update_analysis_status(
+            db=db,
+            result_id=analysis_id,
+            status="failed",
+            error_message=f"Risk assessment failed: {e}"
+        )
+        raise
+    finally:
+        db.close()
+        if cleanup_file:
+            try:
+                os.unlink(file_path)
+            except FileNotFoundError:
+                pass
+
+def queue_risk_assessment(
+    analysis_id: str,
+    query: str,
+    file_path: str,
+    cleanup_file: bool = True,
+    timeout: int = 600
+) -> Optional[str]:
+    """
+    Queue the deferred risk assessment for an analysis that was already returned
+    
+    Args:
+        analysis_id: ID of the AnalysisResult row to complete
+        query: Analysis query
+        file_path: Path to the PDF file
+        cleanup_file: Delete the uploaded file once the job is done
+        timeout: Job timeout in seconds
         
     Returns:
         Job ID if queued successfully, None otherwise
     """
     if not redis_conn:
-        logger.error("Redis not available, falling back to synchronous processing")
         return None
     
     try:
-        # Select queue based on priority
-        if priority == 'high':
-            queue = high_priority_queue
-        elif priority == 'low':
-            queue = low_priority_queue
-        else:
-            queue = normal_queue
-        
-        # Queue the analysis job
-        job = queue.enqueue(
-            run_crew,
+        job = low_priority_queue.enqueue(
+            run_risk_assessment,
+            analysis_id=analysis_id,
             query=query,
             file_path=file_path,
+            cleanup_file=cleanup_file,
             timeout=f'{timeout}s',
-            job_id=f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.path.basename(file_path)}"
+            result_ttl=JOB_RESULT_TTL,
+            failure_ttl=JOB_FAILURE_TTL,
+            job_id=f"risk_{analysis_id}"
         )
-        
-        logger.info(f"Queued analysis job {job.id} with priority {priority}")
+        logger.info(f"Queued risk assessment job {job.id}")
         return job.id
         
     except Exception as e:
-        logger.error(f"Failed to queue analysis job: {e}")
+        logger.error(f"Failed to queue risk assessment job: {e}")
         return None
 
+# The only rq:job:{job_id} fields the status endpoints need; the hash also holds
+# the pickled call and result, which HGETALL would ship on every poll
+_STATUS_FIELDS = ("status", "created_at", "started_at", "ended_at")
+
+def _status_from_hash(job_id: str, values: List[Optional[str]]) -> Dict[str, Any]:
+    """Status fields of a job from an HMGET of _STATUS_FIELDS on its hash"""
+    raw = dict(zip(_STATUS_FIELDS, values))
+    if raw["status"] is None:
+        raise ValueError(f"No such job: {job_id}")
+    
+    def timestamp(field: str) -> Optional[str]:
+        value = raw[field]
+        return utcparse(value).isoformat() if value else None
+    
+    return {
+        "job_id": job_id,
+        "status": raw["status"],
+        "created_at": timestamp("created_at"),
+        "started_at": timestamp("started_at"),
+        "ended_at": timestamp("ended_at"),
+        "progress": 0
+    }
+
+def _add_job_outcome(status_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Attach the result or error of a finished/failed job"""
+    # Results and tracebacks are serialized/compressed; only decode them once the job is done
+    if status_info["status"] in ("finished", "failed"):
+        job = Job.fetch(status_info["job_id"], connection=redis_conn)
+        # Job.is_finished would re-read the status from Redis; the hash already gave it to us
+        if status_info["status"] == "finished":
+            status_info["result"] = job.result
+        else:
+            status_info["error"] = str(job.exc_info)
+    return status_info
+
+# Job statuses per one-second time bucket, shared by the sync and async readers,
+# so polling storms share one Redis read per job
+_STATUS_CACHE_SIZE = 1024
+_status_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_status_cache_lock = threading.Lock()
+
+def _cached_status(job_id: str, bucket: int) -> Optional[Dict[str, Any]]:
+    """Copy of the status cached for job_id in this bucket, if any"""
+    with _status_cache_lock:
+        entry = _status_cache.get(job_id)
+        if entry is None or entry[0] != bucket:
+            return None
+        _status_cache.move_to_end(job_id)
+        return dict(entry[1])
+
+def _cache_status(job_id: str, bucket: int, status_info: Dict[str, Any]):
+    """Remember status_info for this bucket, evicting the least recently used job"""
+    with _status_cache_lock:
+        _status_cache[job_id] = (bucket, dict(status_info))
+        _status_cache.move_to_end(job_id)
+        if len(_status_cache) > _STATUS_CACHE_SIZE:
+            _status_cache.popitem(last=False)
+
 def get_job_status(job_id: str) -> Dict[str, Any]:
     """
     Get the status of a queued job
@@ -99,32 +400,78 @@ def get_job_status(job_id: str) -> Dict[str, Any]:
         return {"error": "Redis not available"}
     
     try:
-        job = Job.fetch(job_id, connection=redis_conn)
+        bucket = int(time.time())
+        status_info = _cached_status(job_id, bucket)
+        if status_info is None:
+            values = redis_conn.hmget(f"rq:job:{job_id}", _STATUS_FIELDS)
+            status_info = _add_job_outcome(_status_from_hash(job_id, values))
+            _cache_status(job_id, bucket, status_info)
+        return status_info
         
-        status_info = {
-            "job_id": job_id,
-            "status": job.get_status(),
-            "created_at": job.created_at.isoformat() if job.created_at else None,
-            "started_at": job.started_at.isoformat() if job.started_at else None,
-            "ended_at": job.ended_at.isoformat() if job.ended_at else None,
-            "progress": getattr(job, 'progress', 0)
-        }
+    except Exception as e:
+        logger.error(f"Failed to get job status for {job_id}: {e}")
+        return {"error": f"Failed to get job status: {e}"}
+
+async def get_job_status_async(job_id: str) -> Dict[str, Any]:
+    """
+    Non-blocking variant of get_job_status for the API's event loop
+    
+    Args:
+        job_id: The job identifier
         
-        # Add result if job is finished
-        if job.is_finished:
-            status_info["result"] = job.result
-        elif job.is_failed:
-            status_info["error"] = str(job.exc_info)
-            
+    Returns:
+        Dictionary with job status information
+    """
+    if not async_redis_conn:
+        return await asyncio.to_thread(get_job_status, job_id)
+    
+    try:
+        bucket = int(time.time())
+        status_info = _cached_status(job_id, bucket)
+        if status_info is None:
+            values = await async_redis_conn.hmget(f"rq:job:{job_id}", _STATUS_FIELDS)
+            status_info = _status_from_hash(job_id, values)
+            if status_info["status"] in ("finished", "failed"):
+                # Decoding the result goes through RQ's sync client
+                status_info = await asyncio.to_thread(_add_job_outcome, status_info)
+            _cache_status(job_id, bucket, status_info)
         return status_info
         
     except Exception as e:
         logger.error(f"Failed to get job status for {job_id}: {e}")
         return {"error": f"Failed to get job status: {e}"}
 
+def _stat_queues() -> List[tuple]:
+    """(name, queue) pairs reported by the stats endpoints"""
+    return [(name, queue) for name, queue in [
+        ('high_priority', high_priority_queue),
+        ('normal', normal_queue),
+        ('low_priority', low_priority_queue)
+    ] if queue]
+
+def _queue_stats_pipeline(pipe, queues: List[tuple]):
+    """Queue length plus live failed/finished registry counts for each queue, 3 commands per queue"""
+    # Registry scores are expiry times, so entries scored before now are already stale
+    now = time.time()
+    for _, queue in queues:
+        pipe.llen(queue.key)
+        pipe.zcount(queue.failed_job_registry.key, now, '+inf')
+        pipe.zcount(queue.finished_job_registry.key, now, '+inf')
+
+def _queue_stats_from_counts(queues: List[tuple], counts: List[int]) -> Dict[str, Any]:
+    """Zip the flat pipeline replies back into per-queue stats"""
+    return {
+        name: {
+            "length": counts[3 * i],
+            "failed_job_count": counts[3 * i + 1],
+            "finished_job_count": counts[3 * i + 2]
+        }
+        for i, (name, _) in enumerate(queues)
+    }
+
 def get_queue_stats() -> Dict[str, Any]:
     """
-    Get statistics about all queues
+    Get statistics about all queues, read in one pipelined round trip
     
     Returns:
         Dictionary with queue statistics
@@ -133,32 +480,44 @@ def get_queue_stats() -> Dict[str, Any]:
         return {"error": "Redis not available"}
     
     try:
-        stats = {}
-        
-        for queue_name, queue in [
-            ('high_priority', high_priority_queue),
-            ('normal', normal_queue),
-            ('low_priority', low_priority_queue)
-        ]:
-            if queue:
-                stats[queue_name] = {
-                    "length": len(queue),
-                    "failed_job_count": queue.failed_job_count,
-                    "finished_job_count": queue.finished_job_count
-                }
+        queues = _stat_queues()
+        pipe = redis_conn.pipeline(transaction=False)
+        _queue_stats_pipeline(pipe, queues)
+        return _queue_stats_from_counts(queues, pipe.execute())
         
-        return stats
+    except Exception as e:
+        logger.error(f"Failed to get queue stats: {e}")
+        return {"error": f"Failed to get queue stats: {e}"}
+
+async def get_queue_stats_async() -> Dict[str, Any]:
+    """
+    Non-blocking variant of get_queue_stats
+    
+    Returns:
+        Dictionary with queue statistics
+    """
+    if not async_redis_conn:
+        return await asyncio.to_thread(get_queue_stats)
+    
+    try:
+        queues = _stat_queues()
+        async with async_redis_conn.pipeline(transaction=False) as pipe:
+            _queue_stats_pipeline(pipe, queues)
+            counts = await pipe.execute()
+        return _queue_stats_from_counts(queues, counts)
         
     except Exception as e:
         logger.error(f"Failed to get queue stats: {e}")
         return {"error": f"Failed to get queue stats: {e}"}
 
-def start_worker(queue_names: list = None):
+def start_worker(queue_names: list = None, num_workers: int = RQ_NUM_WORKERS, burst: bool = False):
     """
-    Start a worker to process queued jobs
+    Start workers to process queued jobs
     
     Args:
         queue_names: List of queue names to process (default: all queues)
+        num_workers: Worker processes to fork; each dequeues from the shared queues independently
+        burst: Exit once the queues are empty instead of waiting for new jobs
     """
     if not redis_conn:
         logger.error("Cannot start worker: Redis not available")
@@ -184,16 +543,48 @@ def start_worker(queue_names: list = None):
         return
     
     try:
+        if num_workers > 1 and WORKER_POOL_AVAILABLE:
+            pool = WorkerPool(queues, connection=redis_conn, num_workers=num_workers)
+            logger.info(f"Starting {num_workers} workers for queues: {queue_names}")
+            pool.start(burst=burst)
+            return
+        
         worker = Worker(queues, connection=redis_conn)
         logger.info(f"Starting worker for queues: {queue_names}")
-        worker.work()
+        worker.work(burst=burst)
         
     except Exception as e:
         logger.error(f"Worker failed: {e}")
 
+# Jobs removed per pipeline, so one batch never holds the Redis thread for long
+CLEANUP_BATCH_SIZE = 500
+
+def _job_keys(job_id: str) -> List[str]:
+    """Every key RQ stores for a job: its hash, results stream and dependency sets"""
+    return [
+        f"rq:job:{job_id}",
+        f"rq:results:{job_id}",
+        f"rq:job:{job_id}:dependents",
+        f"rq:job:{job_id}:dependencies",
+    ]
+
+def _delete_registry_batch(registry_key: str, max_score: float) -> int:
+    """Delete up to CLEANUP_BATCH_SIZE jobs scored at or below max_score; returns how many"""
+    job_ids = redis_conn.zrangebyscore(registry_key, '-inf', max_score, start=0, num=CLEANUP_BATCH_SIZE)
+    if not job_ids:
+        return 0
+    # Keys are named client-side rather than inside a Lua script, so a Cluster client
+    # can route each command to its slot; UNLINK frees the values on a background thread
+    with redis_conn.pipeline(transaction=False) as pipe:
+        for job_id in job_ids:
+            pipe.unlink(*_job_keys(job_id))
+        pipe.zrem(registry_key, *job_ids)
+        pipe.execute()
+    return len(job_ids)
+
 def cleanup_old_jobs(max_age_hours: int = 24):
     """
-    Clean up old completed jobs to save memory
+    Clean up old failed jobs to save memory (finished jobs expire via JOB_RESULT_TTL)
     
     Args:
         max_age_hours: Maximum age of jobs to keep in hours
@@ -203,25 +594,22 @@ def cleanup_old_jobs(max_age_hours: int = 24):
         return
     
     try:
-        cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
+        cutoff_ts = time.time() - max_age_hours * 3600
         
         for queue in [high_priority_queue, normal_queue, low_priority_queue]:
             if queue:
-                # Get all job IDs
-                job_ids = queue.get_job_ids()
-                
-                for job_id in job_ids:
-                    try:
-                        job = Job.fetch(job_id, connection=redis_conn)
-                        
-                        # Delete old completed or failed jobs
-                        if job.ended_at and job.ended_at < cutoff_time:
-                            if job.is_finished or job.is_failed:
-                                job.delete()
-                                logger.info(f"Deleted old job: {job_id}")
-                                
-                    except Exception as job_error:
-                        logger.warning(f"Error processing job {job_id} during cleanup: {job_error}")
+                # Finished jobs expire through result_ttl; only failures kept for
+                # debugging may outlive the retention window
+                registry = FailedJobRegistry(queue=queue)
+                # Registry scores are expiry times (ended_at + failure_ttl)
+                deleted = 0
+                while True:
+                    batch = _delete_registry_batch(registry.key, cutoff_ts + JOB_FAILURE_TTL)
+                    deleted += batch
+                    if batch < CLEANUP_BATCH_SIZE:
+                        break
+                if deleted:
+                    logger.info(f"Deleted {deleted} old failed jobs from {queue.name}")
                         
         logger.info(f"Cleanup completed for jobs older than {max_age_hours} hours")
         
@@ -270,9 +658,12 @@ if __name__ == "__main__":
     
     if len(sys.argv) > 1 and sys.argv[1] == "worker":
         # Run as worker
-        queue_names = sys.argv[2:] if len(sys.argv) > 2 else None
-        start_worker(queue_names)
+        args = sys.argv[2:]
+        burst = "--burst" in args
+        queue_names = [arg for arg in args if arg != "--burst"] or None
+        start_worker(queue_names, burst=burst)
     else:
         print("Usage:")
-        print("  python redis_queue.py worker [queue_names...]")
-        print("  Example: python redis_queue.py worker high_priority normal")
\ No newline at end of file
+        print("  python redis_queue.py worker [--burst] [queue_names...]")
+        print("  Example: python redis_queue.py worker high_priority normal")
+        print("  Set RQ_NUM_WORKERS to change the number of worker processes (default: CPU count)")
\ No newline at end of file
@@ -0,0 +1,305 @@
+"""
+Wrappers around the CrewAI LLM shared by all agents.
+
+RateLimitedLLM keeps every agent, across all threads of the process,
+under the provider's requests-per-minute and tokens-per-minute limits.
+It waits before a call instead of letting the provider answer with 429s.
+
+CoalescingLLM sends identical concurrent prompts to the provider once and
+shares the response between the callers. It does not batch distinct prompts.
+
+CachedLLM answers repeated prompts from the llm_cache table in
+the database module instead of calling the provider again.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Union
+
+from crewai import LLM
+
+# Optional: exact token counts for OpenAI models
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Optional: persistent response cache (needs SQLAlchemy; bonus_database.py is deployed as database.py)
+try:
+    from database import init_llm_cache, get_cached_response, save_cached_response
+    LLM_CACHE_AVAILABLE = True
+except ImportError as e:
+    # Import errors from inside database.py (e.g. missing SQLAlchemy) land here too
+    logger.error(f"LLM response cache disabled: could not import the 'database' module "
+                 f"(deploy bonus_database.py as database.py and install SQLAlchemy): {e}")
+    LLM_CACHE_AVAILABLE = False
+
+# Provider tier limits (defaults match OpenAI tier 1 for gpt-4o-mini)
+LLM_RPM = int(os.getenv("LLM_RPM", "500"))
+LLM_TPM = int(os.getenv("LLM_TPM", "200000"))
+
+# Response cache switch ("0" disables it)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") == "1"
+
+# After a 429, shrink capacity by this factor for this many seconds
+PENALTY_FACTOR = 0.8
+PENALTY_SECONDS = 60
+
+
+class TokenBucket:
+    """Thread-safe token bucket that refills its full capacity once per minute."""
+
+    def __init__(self, capacity_per_minute: int):
+        self.base_capacity = float(capacity_per_minute)
+        self.capacity = self.base_capacity
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.penalty_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        if self.penalty_until and now >= self.penalty_until:
+            self.capacity = self.base_capacity
+            self.penalty_until = 0.0
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.capacity / 60.0)
+        self.updated_at = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take `amount` tokens from the bucket.
+
+        Returns:
+            float: Seconds the caller must wait before the reserved tokens are available.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # A single request larger than the bucket would otherwise wait forever
+            self.tokens -= min(amount, self.capacity)
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens * 60.0 / self.capacity
+
+    def penalize(self):
+        """Temporarily shrink the bucket after the provider rejected a call."""
+        with self._lock:
+            self.capacity = max(1.0, self.capacity * PENALTY_FACTOR)
+            self.tokens = min(self.tokens, self.capacity)
+            self.penalty_until = time.monotonic() + PENALTY_SECONDS
+
+
+class RateLimiter:
+    """Combined requests-per-minute and tokens-per-minute limiter."""
+
+    def __init__(self, rpm: int = LLM_RPM, tpm: int = LLM_TPM):
+        self.rpm = TokenBucket(rpm)
+        self.tpm = TokenBucket(tpm)
+
+    def acquire(self, est_tokens: int):
+        """Block just long enough for one request of `est_tokens` to stay under both limits."""
+        wait = max(self.rpm.reserve(1), self.tpm.reserve(est_tokens))
+        if wait > 0:
+            logger.info(f"Rate limiter delaying LLM call by {wait:.2f}s")
+            time.sleep(wait)
+
+    def penalize(self):
+        self.rpm.penalize()
+        self.tpm.penalize()
+
+
+@lru_cache(maxsize=1)
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide limiter shared by every LLM instance."""
+    return RateLimiter()
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    # Encoder construction loads BPE tables (downloaded on first use), so each model is built once
+    try:
+        return tiktoken.encoding_for_model(model.split("/")[-1])
+    except KeyError:
+        # Non-OpenAI models: cl100k is a close enough estimate
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def warm_up(model: str = "gpt-4o-mini"):
+    """Build the tokenizer ahead of the first request (call from app startup)."""
+    if TIKTOKEN_AVAILABLE:
+        try:
+            _get_encoding(model)
+        except Exception as e:
+            logger.warning(f"Could not preload tokenizer for {model}: {e}")
+
+
+def _messages_to_text(messages: Union[str, List[Dict[str, Any]]]) -> str:
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(message.get("content", "")) for message in messages)
+
+
+def estimate_tokens(messages: Union[str, List[Dict[str, Any]]], model: str = "gpt-4o-mini") -> int:
+    """Estimate the prompt size of a call in tokens."""
+    text = _messages_to_text(messages)
+    if TIKTOKEN_AVAILABLE:
+        return len(_get_encoding(model).encode(text))
+    return len(text) // 4  # ~4 characters per token
+
+
+def split_by_tokens(text: str, max_tokens: int, overlap: int = 0, model: str = "gpt-4o-mini") -> List[str]:
+    """
+    Split text into windows of at most `max_tokens` tokens, each sharing `overlap`
+    tokens with the previous one. Text that already fits is returned as one window.
+
+    Raises:
+        ValueError: If max_tokens is not positive or overlap is not smaller than max_tokens.
+    """
+    if max_tokens <= 0 or not 0 <= overlap < max_tokens:
+        raise ValueError(f"Need 0 <= overlap < max_tokens, got overlap={overlap}, max_tokens={max_tokens}")
+    step = max_tokens - overlap
+    if TIKTOKEN_AVAILABLE:
+        encoding = _get_encoding(model)
+        tokens = encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return [text]
+        return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens) - overlap, step)]
+    # Without tiktoken, fall back to ~4 characters per token
+    if len(text) <= max_tokens * 4:
+        return [text]
+    return [text[i:i + max_tokens * 4] for i in range(0, len(text) - overlap * 4, step * 4)]
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+class RateLimitedLLM(LLM):
+    """CrewAI LLM that waits for the shared rate limiter before every call."""
+
+    def __init__(self, *args, limiter: RateLimiter = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter or get_rate_limiter()
+
+    def call(self, messages, *args, **kwargs):
+        self.limiter.acquire(estimate_tokens(messages, self.model))
+        try:
+            return super().call(messages, *args, **kwargs)
+        except Exception as e:
+            if _is_rate_limit_error(e):
+                logger.warning("LLM provider returned 429, reducing rate limiter capacity for 60s")
+                self.limiter.penalize()
+            raise
+
+
+def prompt_key(model: str, messages: Union[str, List[Dict[str, Any]]], temperature: float = None) -> str:
+    """SHA-256 identifying one prompt for one model configuration."""
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "messages": messages},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _InFlightCall:
+    """Callers waiting on one in-flight provider request for the same prompt."""
+
+    def __init__(self):
+        self.waiters = 0
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class CoalescingLLM(RateLimitedLLM):
+    """
+    Rate-limited LLM that coalesces identical prompts while one is in flight.
+
+    The first caller of a prompt sends the request immediately; identical calls
+    arriving before its response wait for it instead of sending their own, and
+    every caller gets the same response. Distinct prompts are never combined into
+    one request. Calls with native tool schemas are never coalesced.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._in_flight: Dict[str, _InFlightCall] = {}
+        self._in_flight_lock = threading.Lock()
+
+    def call(self, messages, *args, **kwargs):
+        if kwargs.get("tools") or kwargs.get("available_functions"):
+            return super().call(messages, *args, **kwargs)
+
+        key = prompt_key(self.model, messages, self.temperature)
+        with self._in_flight_lock:
+            pending = self._in_flight.get(key)
+            if pending is None:
+                pending = self._in_flight[key] = _InFlightCall()
+                is_leader = True
+            else:
+                pending.waiters += 1
+                is_leader = False
+
+        if not is_leader:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+
+        try:
+            pending.result = super().call(messages, *args, **kwargs)
+            return pending.result
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._in_flight_lock:
+                # Stay registered until the response is in, so late duplicates join this request
+                del self._in_flight[key]
+            if pending.waiters:
+                logger.info(f"Answered {pending.waiters} duplicate LLM call(s) from one in-flight request")
+            pending.done.set()
+
+
+class CachedLLM(CoalescingLLM):
+    """
+    Coalescing, rate-limited LLM that answers repeated prompts from the llm_cache table.
+
+    Args:
+        cache_ttl (int): Maximum age in seconds of a usable cache entry; None never
+            expires. Agents whose prompts embed live web search results should set it.
+    """
+
+    def __init__(self, *args, cache_ttl: int = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_ttl = cache_ttl
+        self.cache_enabled = LLM_CACHE_AVAILABLE and LLM_CACHE_ENABLED
+        if self.cache_enabled:
+            try:
+                init_llm_cache()
+            except Exception as e:
+                logger.warning(f"LLM cache disabled, could not create table: {e}")
+                self.cache_enabled = False
+
+    def call(self, messages, *args, **kwargs):
+        if not self.cache_enabled or kwargs.get("tools") or kwargs.get("available_functions"):
+            return super().call(messages, *args, **kwargs)
+
+        key = prompt_key(self.model, messages, self.temperature)
+        cached = get_cached_response(key, max_age_seconds=self.cache_ttl)
+        if cached is not None:
+            logger.info(f"LLM cache hit for prompt {key[:12]}")
+            return cached
+
+        response = super().call(messages, *args, **kwargs)
+        if isinstance(response, str):  # Tool-call responses are not cached
+            save_cached_response(key, self.model, response)
+        return response
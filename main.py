@@ -1,91 +1,405 @@
 # === Import Required Libraries ===
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse, ORJSONResponse
+from starlette.background import BackgroundTask
 import os
+import json
 import uuid
-import asyncio  #Run CPU-intensive tasks in background threads
+import tempfile  #Atomic report writes
+import aiofiles  #Chunked upload writes that don't block the event loop
+import asyncio  #Run the independent agents concurrently
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
 from datetime import datetime #Timestamp for output files
 
 # CrewAI imports
 from crewai import Crew, Process 
 #Crew	Orchestrates multiple agents working together
 #Process	Defines how agents execute (sequential/parallel)
-from agents import financial_analyst, verifier, investment_advisor, risk_assessor #tax_analyst
-from task import analyze_financial_document, verification, investment_analysis, risk_assessment #tax_analysis
+# Agents and tasks are built lazily on the first request (see agents.get_llm)
+from agents import get_financial_analyst, get_verifier, get_investment_advisor, get_risk_assessor, get_synthesizer #get_tax_analyst
+from task import (get_analyze_financial_document, get_verification, get_investment_analysis,
+                  get_risk_assessment, get_synthesis, build_shared_context,
+                  build_chunk_analysis_task, build_chunk_reduce_task) #get_tax_analysis
+from tools import fast_verify, pin_document, read_data_tool_async
+from llm_utils import split_by_tokens, warm_up
+
+# Optional: token streaming events (module path differs between CrewAI releases)
+try:
+    from crewai.utilities.events import crewai_event_bus, LLMStreamChunkEvent
+    STREAMING_AVAILABLE = True
+except ImportError:
+    try:
+        from crewai.events import crewai_event_bus, LLMStreamChunkEvent
+        STREAMING_AVAILABLE = True
+    except ImportError:
+        STREAMING_AVAILABLE = False
 
 # === Initialize FastAPI App ===
-app = FastAPI(title="Financial Document Analyzer")
+# JSON responses are encoded with orjson; the SSE endpoint returns its own StreamingResponse
+app = FastAPI(title="Financial Document Analyzer", default_response_class=ORJSONResponse)
+
+# Upper bound on how many agent crews may call the LLM at the same time
+MAX_PARALLEL_AGENTS = int(os.getenv("MAX_PARALLEL_AGENTS", "3"))
+
+# Above this confidence the automated pre-check replaces the verifier agent
+FAST_VERIFY_CONFIDENCE = 0.9
+
+# Documents longer than one window are analyzed chunk by chunk, then reduced
+DOCUMENT_CHUNK_TOKENS = int(os.getenv("DOCUMENT_CHUNK_TOKENS", "6000"))
+DOCUMENT_CHUNK_OVERLAP = int(os.getenv("DOCUMENT_CHUNK_OVERLAP", "200"))
+
+# Uploads are copied to disk 64KB at a time
+UPLOAD_CHUNK_SIZE = 1 << 16
+
+
+# === Token Streaming ===
+# The sink is set per streaming request; the agent name per crew. asyncio tasks and
+# kickoff_async's worker threads inherit both, so chunks reach the right client tagged
+# with the agent that produced them.
+_stream_sink: ContextVar = ContextVar("stream_sink", default=None)
+_stream_agent: ContextVar = ContextVar("stream_agent", default="")
+
+# Analyses whose client disconnected; the event loop only holds tasks weakly
+_detached_analyses: set = set()
+
+if STREAMING_AVAILABLE:
+    @crewai_event_bus.on(LLMStreamChunkEvent)
+    def _forward_stream_chunk(source, event):
+        sink = _stream_sink.get()
+        if sink is not None:
+            sink(_stream_agent.get(), event.chunk)
+
+
+# === Combined Result of One Analysis Run ===
+@dataclass
+class AnalysisReport:
+    """
+    Outputs of every stage of one analysis run.
+
+    str(report) returns the synthesized report, so callers that only
+    need the final text can keep treating the result as a string.
+    """
+    verification: str
+    financial_analysis: str
+    investment_analysis: str
+    risk_assessment: str
+    summary: str
+
+    def __str__(self) -> str:
+        return self.summary
 
 
 # === Function: Run the Complete Multi-Agent Crew ===
-# This function runs all four agents sequentially to analyze the financial document.
-#This is the heart of the application - it orchestrates all 4 AI agents.
+# The verifier runs first, then the analyst, investment advisor and risk assessor
+# run in parallel on the same document, and the synthesizer merges their reports.
+#This is the heart of the application - it orchestrates all the AI agents.
+
+# Agent and task getters of each fixed pipeline stage
+_STAGES = {
+    "verifier": (get_verifier, get_verification),
+    "financial_analyst": (get_financial_analyst, get_analyze_financial_document),
+    "investment_advisor": (get_investment_advisor, get_investment_analysis),
+    "risk_assessor": (get_risk_assessor, get_risk_assessment),
+    "synthesizer": (get_synthesizer, get_synthesis),
+}
+
 
-def run_crew(query: str, file_path: str = "data/sample.pdf"):
+@lru_cache(maxsize=None)
+def get_stage_crew(stage: str) -> Crew:
     """
-    Runs all financial agents sequentially (Verifier → Analyst → Investment → Risk).
-    
+    Single-agent crew for one fixed pipeline stage, built and validated once.
+
+    Never kick this crew off directly: kickoff interpolates its tasks and resets its
+    run state in place, so each run works on a copy (see _kickoff_stage).
+    """
+    get_agent, get_task = _STAGES[stage]
+    return Crew(agents=[get_agent()], tasks=[get_task()], process=Process.sequential)
+
+
+async def _kickoff_stage(stage: str, inputs: dict, semaphore: asyncio.Semaphore = None):
+    """Runs a fixed pipeline stage (see _STAGES) on a copy of its cached crew."""
+    # copy() clones agents and tasks, so concurrent requests can't see each other's inputs
+    return await _kickoff_crew(get_stage_crew(stage).copy(), inputs, semaphore, stream_name=stage)
+
+
+async def _kickoff_single(agent, task, inputs: dict, semaphore: asyncio.Semaphore = None, stream_name: str = ""):
+    """
+    Runs one agent/task pair as its own crew (for tasks built per request, like chunks).
+
+    Args:
+        agent: The agent that performs the task.
+        task: The task to execute.
+        inputs (dict): Values interpolated into the task description.
+        semaphore (asyncio.Semaphore): Optional limit on concurrent crews.
+        stream_name (str): Agent name attached to streamed token frames.
+
+    Returns:
+        str: The raw text output of the task.
+    """
+    crew = Crew(agents=[agent], tasks=[task], process=Process.sequential)
+    return await _kickoff_crew(crew, inputs, semaphore, stream_name)
+
+
+async def _kickoff_crew(crew: Crew, inputs: dict, semaphore: asyncio.Semaphore = None, stream_name: str = ""):
+    """Kicks off a crew, optionally under a concurrency limit, and returns its text output."""
+    _stream_agent.set(stream_name)
+    if semaphore is None:
+        result = await crew.kickoff_async(inputs=inputs)
+    else:
+        async with semaphore:
+            result = await crew.kickoff_async(inputs=inputs)
+    return str(result)
+
+
+async def _run_financial_analysis(inputs: dict, semaphore: asyncio.Semaphore) -> str:
+    """
+    Runs the financial analyst, splitting oversized documents into token windows.
+
+    Small documents go through the normal analysis task. Larger ones are analyzed
+    window by window in parallel (map), then merged by one reduce task.
+
+    Args:
+        inputs (dict): Stage inputs (query, file_path, shared_context).
+        semaphore (asyncio.Semaphore): Limit on concurrent crews.
+
+    Returns:
+        str: The financial analysis report.
+    """
+    document_text = await read_data_tool_async(inputs["file_path"])
+    chunks = split_by_tokens(document_text, DOCUMENT_CHUNK_TOKENS, DOCUMENT_CHUNK_OVERLAP)
+    if len(chunks) <= 1:
+        return await _kickoff_stage("financial_analyst", inputs, semaphore)
+
+    chunk_notes = await asyncio.gather(*(
+        _kickoff_single(get_financial_analyst(), build_chunk_analysis_task(), {
+            **inputs,
+            "document_chunk": chunk,
+            "chunk_index": i + 1,
+            "chunk_count": len(chunks),
+        }, semaphore, stream_name="financial_analyst")
+        for i, chunk in enumerate(chunks)
+    ))
+    chunk_summaries = "\n\n".join(f"--- Part {i + 1} ---\n{notes}" for i, notes in enumerate(chunk_notes))
+    return await _kickoff_single(get_financial_analyst(), build_chunk_reduce_task(),
+                                 {**inputs, "chunk_summaries": chunk_summaries}, semaphore,
+                                 stream_name="financial_analyst")
+
+
+def format_fast_verification(ok: bool, confidence: float, notes: list) -> str:
+    """
+    Renders a fast_verify() result as a verification report.
+
+    Args:
+        ok (bool): Whether the document passed.
+        confidence (float): Confidence of the verdict.
+        notes (list): Findings of the pre-check.
+
+    Returns:
+        str: Report in place of the verifier agent's output.
+    """
+    lines = [f"Document verification (automated pre-check): {'PASS' if ok else 'FAIL'}",
+             f"Confidence: {confidence:.2f}"]
+    lines += [f"- {note}" for note in notes]
+    lines.append("Recommendation: " + ("proceed with analysis" if ok else "do not rely on this document"))
+    return "\n".join(lines)
+
+
+async def run_crew_async(query: str, file_path: str = "data/sample.pdf") -> AnalysisReport:
+    """
+    Runs the verifier, then the three independent agents in parallel, then the synthesizer.
+
+    Wall clock is roughly verifier + slowest parallel agent + synthesizer,
+    instead of the sum of all four agents. A document the pre-check confidently
+    rejects stops after verification, with that report as the summary.
+
     Args:
         query (str): User's question or focus area.
         file_path (str): Path of the financial document (uploaded or default).
-    
+
     Returns:
-        result: The combined CrewAI result after all tasks are executed.
-    """
-    # Create the multi-agent workflow
-    financial_crew = Crew(
-        agents=[verifier, financial_analyst, investment_advisor, risk_assessor],#tax_analyst
-        tasks=[verification, analyze_financial_document, investment_analysis, risk_assessment],#tax_analysis,
-        process=Process.sequential, 
-        # Agents will execute one after another # Investment & Risk analysis can run in parallel
-        #process=Process.hierarchical
+        AnalysisReport: The output of every stage plus the merged report.
+    """
+    inputs = {"query": query, "file_path": file_path}
+
+    # Stage 1: make sure the document is usable before spending calls on it;
+    # the LLM verifier only runs when the deterministic pre-check is unsure
+    ok, confidence, notes = await asyncio.to_thread(fast_verify, file_path)
+    if confidence > FAST_VERIFY_CONFIDENCE:
+        verification_report = format_fast_verification(ok, confidence, notes)
+        if not ok:
+            # Confidently not a usable financial document; don't spend agent calls on it
+            return AnalysisReport(
+                verification=verification_report,
+                financial_analysis="",
+                investment_analysis="",
+                risk_assessment="",
+                summary=verification_report,
+            )
+    else:
+        verification_report = await _kickoff_stage("verifier", inputs)
+
+    # Stage 2: fan out the agents that only depend on the document
+    stage_inputs = {**inputs, "shared_context": build_shared_context(file_path, query, verification_report)}
+    semaphore = asyncio.Semaphore(MAX_PARALLEL_AGENTS)
+    financial_report, investment_report, risk_report = await asyncio.gather(
+        _run_financial_analysis(stage_inputs, semaphore),
+        _kickoff_stage("investment_advisor", stage_inputs, semaphore),
+        _kickoff_stage("risk_assessor", stage_inputs, semaphore),
     )
 
-    # Start the analysis process
-    result = financial_crew.kickoff({"query": query, "file_path": file_path})
-    return result
+    # Stage 3: fan in
+    summary = await _kickoff_stage("synthesizer", {
+        **inputs,
+        "verification_report": verification_report,
+        "financial_report": financial_report,
+        "investment_report": investment_report,
+        "risk_report": risk_report,
+    })
 
+    return AnalysisReport(
+        verification=verification_report,
+        financial_analysis=financial_report,
+        investment_analysis=investment_report,
+        risk_assessment=risk_report,
+        summary=summary,
+    )
 
-# === Function: Save Output to "output/" Folder ===
-def save_output_report(query: str, file_path: str, analysis_text: str) -> str:
+
+def run_risk_crew(query: str, file_path: str = "data/sample.pdf") -> str:
     """
-    Saves the analysis output report to an 'output/' folder as a .txt file.
+    Runs only the risk assessor, for callers that deliver it separately (background jobs).
+
+    Args:
+        query (str): User's question or focus area.
+        file_path (str): Path of the financial document.
+
+    Returns:
+        str: The risk assessment report.
+    """
+    inputs = {"query": query, "file_path": file_path, "shared_context": build_shared_context(file_path, query)}
+    return asyncio.run(_kickoff_stage("risk_assessor", inputs))
+
+
+def run_crew(query: str, file_path: str = "data/sample.pdf") -> AnalysisReport:
+    """
+    Synchronous entry point for callers without an event loop (e.g. queue workers).
     
     Args:
-        query (str): The analysis query used.
-        file_path (str): Path of the financial document analyzed.
-        analysis_text (str): The generated analysis content.
+        query (str): User's question or focus area.
+        file_path (str): Path of the financial document (uploaded or default).
     
     Returns:
-        str: Full path to the saved output file.
+        AnalysisReport: The combined result after all tasks are executed.
     """
-    # Ensure output directory exists
-    os.makedirs("output", exist_ok=True)
+    return asyncio.run(run_crew_async(query, file_path))
 
+
+# === Function: Save Output to "output/" Folder ===
+def output_report_path() -> str:
+    """
+    Picks the path of the next report in the 'output/' folder.
+
+    Returns:
+        str: Path of a timestamped .txt file inside 'output/'.
+    """
     # Generate unique filename using timestamp
     """Prevents overwriting previous reports
        Allows tracking analysis history
        Each analysis gets a unique file"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"financial_analysis_{timestamp}.txt"
-    output_path = os.path.join("output", filename)
+    return os.path.join("output", filename)
+
+
+def save_output_report(query: str, file_path: str, analysis_text: str, output_path: str = None) -> str:
+    """
+    Saves the analysis output report to an 'output/' folder as a .txt file.
+    
+    Args:
+        query (str): The analysis query used.
+        file_path (str): Path of the financial document analyzed.
+        analysis_text (str): The generated analysis content.
+        output_path (str): Where to write the report. Defaults to output_report_path().
+    
+    Returns:
+        str: Full path to the saved output file.
+    """
+    output_path = output_path or output_report_path()
+
+    report = "".join([
+        "=== Financial Document Analysis Report ===\n\n",
+        f"Query: {query}\n",
+        f"Analyzed File: {file_path}\n",
+        f"Generated On: {datetime.now()}\n\n",
+        "=== Full Analysis Output ===\n\n",
+        str(analysis_text),
+        "\n\n=== End of Report ===\n",
+    ])
 
+    tmp_path = None
     try:
-        # Write analysis details into the file
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write("=== Financial Document Analysis Report ===\n\n")
-            f.write(f"Query: {query}\n")
-            f.write(f"Analyzed File: {file_path}\n")
-            f.write(f"Generated On: {datetime.now()}\n\n")
-            f.write("=== Full Analysis Output ===\n\n")
-            f.write(str(analysis_text))
-            f.write("\n\n=== End of Report ===\n")
+        # Write to a temp file next to the target, then rename: readers never see a partial report
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(output_path) or ".", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(report)
+        os.replace(tmp_path, output_path)
 
         return output_path
     except Exception as e:
         print(f" Error saving report: {e}")
+        if tmp_path:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
         return None
 
 
+# === Function: Stream an Upload to Disk ===
+def _sendfile_copy(src_fd: int, file_path: str):
+    """Copies a whole file descriptor to file_path inside the kernel (no user-space buffers)."""
+    size = os.fstat(src_fd).st_size
+    with open(file_path, "wb") as dst:
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(dst.fileno(), src_fd, offset, size - offset)
+            if sent == 0:
+                break
+            offset += sent
+
+
+async def save_upload(file: UploadFile, file_path: str):
+    """
+    Copies an uploaded file to disk.
+
+    Uploads that Starlette already spooled to a temp file are copied with os.sendfile;
+    small in-memory uploads are written in UPLOAD_CHUNK_SIZE pieces.
+
+    Args:
+        file (UploadFile): The uploaded document.
+        file_path (str): Destination path.
+    """
+    if getattr(file.file, "_rolled", False) and hasattr(os, "sendfile"):
+        await asyncio.to_thread(_sendfile_copy, file.file.fileno(), file_path)
+        return
+
+    async with aiofiles.open(file_path, "wb") as f:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await f.write(chunk)
+
+
+# === Startup: Preload Per-Process Resources ===
+@app.on_event("startup")
+async def startup_event():
+    """Creates the upload and report folders, then loads the tokenizer and parses the sample document once so the first analysis doesn't pay for them."""
+    os.makedirs("data", exist_ok=True)
+    os.makedirs("output", exist_ok=True)
+    await asyncio.to_thread(warm_up)
+    await asyncio.to_thread(pin_document, "data/sample.pdf")
+
+
 # === Health Check Endpoint ===
 @app.get("/")
 async def root():
@@ -110,6 +424,7 @@ async def favicon():
 # === Main Endpoint: Analyze Financial Document ===
 @app.post("/analyze")
 async def analyze_financial_doc(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(None),
     query: str = Form(default="Analyze this financial document for investment insights")
 ):
@@ -118,50 +433,40 @@ async def analyze_financial_doc(
     
     - Accepts an optional uploaded PDF file.
     - Uses a default sample file if no upload is provided.
-    - Runs all four analysis agents sequentially.
-    - Saves the result in the output folder.
+    - Runs the verifier, then the analysis agents in parallel.
+    - Saves the result in the output folder once the response is sent
+      (output_report_status is "pending" until the file appears).
     """
     file_path = "data/sample.pdf"  # Default fallback file
     file_id = None  # For cleanup tracking
 
     try:
-        # Ensure data directory exists for temporary files
-        os.makedirs("data", exist_ok=True)
-
         # If a user uploaded a file, save it temporarily
         if file:
             file_id = str(uuid.uuid4())
             file_path = f"data/financial_document_{file_id}.pdf"
-            with open(file_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
+            await save_upload(file, file_path)
 
         # Clean and validate query text
         query = query.strip() or "Analyze this financial document for investment insights"
 
-        # Run the full analysis in a non-blocking thread
-        """Why asyncio.to_thread()?
-
-            CrewAI's run_crew() is CPU-intensive and blocking:
+        # Run the full analysis without blocking the event loop
+        """Each crew's kickoff_async() runs in a worker thread, so other
+            users can still access the API while one analysis runs."""
+        response = await run_crew_async(query, file_path)
 
-            Takes 30-60 seconds to complete
-            Would freeze the entire server if run directly
-        Solution:
-
-            asyncio.to_thread(): Runs run_crew() in a separate thread
-            await: Waits for result without blocking other requests
-            Other users can still access the API while one analysis runs"""
-        response = await asyncio.to_thread(run_crew, query, file_path)
-
-        # Save analysis report to output folder
-        output_path = save_output_report(query, file_path, str(response))
+        # Save analysis report to output folder after the response is sent
+        output_path = output_report_path()
+        background_tasks.add_task(save_output_report, query, file_path, str(response), output_path)
 
         # Return API response
         return {
             "status": "success",
             "query": query,
             "file_used": os.path.basename(file_path),
-            "output_report": output_path if output_path else "Failed to save report",
+            "output_report": output_path,
+            # Written after this response is sent; failures are logged by save_output_report
+            "output_report_status": "pending",
         }
 
     except Exception as e:
@@ -170,11 +475,119 @@ async def analyze_financial_doc(
 
     finally:
         # Clean up uploaded files (keep default file intact)
-        if file_id and os.path.exists(file_path):
+        if file_id:
             try:
-                os.remove(file_path)
-            except:
-                pass  # Ignore cleanup errors silently
+                os.unlink(file_path)
+            except OSError:
+                pass  # Already gone, or otherwise not removable: ignore silently
+
+
+# === Function: Remove a Temporary Upload ===
+def remove_upload(file_path: str):
+    """Deletes a saved upload, ignoring files that are already gone or can't be removed."""
+    try:
+        os.unlink(file_path)
+    except OSError:
+        pass  # Ignore cleanup errors silently
+
+
+# === Streaming Endpoint: Analyze with Live Agent Output ===
+def _sse(payload: dict) -> str:
+    """Formats one Server-Sent Events frame."""
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+@app.post("/analyze-stream")
+async def analyze_financial_doc_stream(
+    file: UploadFile = File(None),
+    query: str = Form(default="Analyze this financial document for investment insights")
+):
+    """
+    Same analysis as /analyze, streamed as Server-Sent Events.
+
+    - Emits {"agent": ..., "delta": ...} frames as the agents generate text.
+    - Ends with a {"agent": "final", "report": ..., "output_report": ...} frame.
+    - The report is saved to the output folder even if the client disconnects.
+    """
+    if not STREAMING_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Streaming requires a CrewAI version with LLM stream events")
+
+    file_path = "data/sample.pdf"  # Default fallback file
+    file_id = None  # For cleanup tracking
+
+    if file:
+        file_id = str(uuid.uuid4())
+        file_path = f"data/financial_document_{file_id}.pdf"
+        try:
+            await save_upload(file, file_path)
+        except Exception as e:
+            # Don't leave a partial upload behind
+            remove_upload(file_path)
+            raise HTTPException(status_code=500, detail=f"Error saving uploaded file: {str(e)}")
+
+    query = query.strip() or "Analyze this financial document for investment insights"
+    started = False
+
+    def finish_detached(analysis: asyncio.Task):
+        # Runs on the event loop once a disconnected client's analysis ends
+        _detached_analyses.discard(analysis)
+        try:
+            save_output_report(query, file_path, str(analysis.result()))
+        except BaseException as e:  # Includes cancellation at shutdown
+            print(f" Analysis failed after client disconnected: {e!r}")
+        finally:
+            if file_id:
+                remove_upload(file_path)
+
+    def remove_unstarted_upload():
+        # The generator's finally never runs if the client leaves before the first frame
+        if file_id and not started:
+            remove_upload(file_path)
+
+    async def event_stream():
+        nonlocal started
+        started = True
+        frames = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+
+        def sink(agent: str, delta: str):
+            # Called from the crews' worker threads
+            loop.call_soon_threadsafe(frames.put_nowait, {"agent": agent, "delta": delta})
+
+        # The analysis task copies the current context, including the sink
+        token = _stream_sink.set(sink)
+        analysis = asyncio.create_task(run_crew_async(query, file_path))
+        _stream_sink.reset(token)
+
+        report = None
+        try:
+            while not analysis.done() or not frames.empty():
+                next_frame = asyncio.ensure_future(frames.get())
+                done, _ = await asyncio.wait({next_frame, analysis}, return_when=asyncio.FIRST_COMPLETED)
+                if next_frame in done:
+                    yield _sse(next_frame.result())
+                else:
+                    next_frame.cancel()
+            report = analysis.result()
+            output_path = save_output_report(query, file_path, str(report))
+            yield _sse({
+                "agent": "final",
+                "report": str(report),
+                "output_report": output_path if output_path else "Failed to save report",
+            })
+        except Exception as e:
+            yield _sse({"agent": "error", "error": str(e)})
+        finally:
+            if report is None and not analysis.done():
+                # Client went away mid-analysis: the generator is being cancelled, so
+                # save the report (and only then drop the upload) when the task ends
+                _detached_analyses.add(analysis)
+                analysis.add_done_callback(finish_detached)
+            elif file_id:
+                remove_upload(file_path)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             background=BackgroundTask(remove_unstarted_upload))
 
 
 # === Run the API Locally ===
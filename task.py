@@ -1,102 +1,235 @@
 ## Importing libraries and files
+import os
+import json
+from functools import lru_cache
 from crewai import Task
-from agents import financial_analyst, verifier, investment_advisor, risk_assessor
-#from agents import financial_analyst, verifier, investment_advisor, risk_assessor, tax_analyst
+from agents import get_financial_analyst, get_verifier, get_investment_advisor, get_risk_assessor, get_synthesizer
+#from agents import get_financial_analyst, get_verifier, get_investment_advisor, get_risk_assessor, get_tax_analyst
 from tools import search_tool, read_data_tool, analyze_investment_tool, create_risk_assessment_tool
 
+# Cap on the verifier summary handed to later agents (~1500 tokens at ~4 chars/token)
+SHARED_CONTEXT_MAX_CHARS = 6000
+
+
+def build_shared_context(file_path: str, query: str, verification_report: str = "") -> str:
+    """
+    Build the structured memory passed from the verifier to the analysis tasks.
+
+    Only a bounded summary is forwarded, so every later LLM turn carries a
+    fixed-size context instead of the full conversation history.
+
+    Args:
+        file_path (str): Path of the analyzed document.
+        query (str): The user's query.
+        verification_report (str): Output of the verification task.
+
+    Returns:
+        str: JSON object with filename, query and verification_summary.
+    """
+    summary = verification_report.strip()
+    if len(summary) > SHARED_CONTEXT_MAX_CHARS:
+        summary = summary[:SHARED_CONTEXT_MAX_CHARS] + " ...[truncated]"
+    return json.dumps({
+        "filename": os.path.basename(file_path),
+        "query": query,
+        "verification_summary": summary,
+    })
+
+
 ## Creating a task to analyze financial documents
-analyze_financial_document = Task(
-    description="""
-    Analyze the financial document at {file_path} thoroughly to address the user's query: {query}
+@lru_cache(maxsize=1)
+def get_analyze_financial_document() -> Task:
+    return Task(
+        description="""
+        Analyze the financial document at {file_path} thoroughly to address the user's query: {query}
+        Verification notes (JSON): {shared_context}
     
-    Steps:
-    1. Use the Financial Document Reader tool to read the document at {file_path}
-    2. Identify key financial metrics (revenue, profit, cash flow, debt, etc.)
-    3. Analyze trends and patterns in the data
-    4. Provide actionable insights
-    5. Highlight risks and opportunities
-    """,
-    expected_output="""
-    Comprehensive financial analysis report including:
-    - Executive summary of key findings
-    - Analysis of important financial metrics and trends
-    - Insights and strategic recommendations
-    - Identified limitations or data gaps
-    """,
-    agent=financial_analyst,#Assigns a specific agent to perform this task
-    async_execution=False,#Tasks run one after another (sequential), not in parallel
-)
+        Steps:
+        1. Use the Financial Document Reader tool to read the document at {file_path}
+        2. Identify key financial metrics (revenue, profit, cash flow, debt, etc.)
+        3. Analyze trends and patterns in the data
+        4. Provide actionable insights
+        5. Highlight risks and opportunities
+        """,
+        expected_output="""
+        Comprehensive financial analysis report including:
+        - Executive summary of key findings
+        - Analysis of important financial metrics and trends
+        - Insights and strategic recommendations
+        - Identified limitations or data gaps
+        """,
+        agent=get_financial_analyst(),#Assigns a specific agent to perform this task
+        async_execution=False,#Tasks run one after another (sequential), not in parallel
+    )
 
 ## Creating a document verification task
-verification = Task(
-    description="""
-    Verify the financial document at {file_path} for accessibility, completeness, and data quality.
+@lru_cache(maxsize=1)
+def get_verification() -> Task:
+    return Task(
+        description="""
+        Verify the financial document at {file_path} for accessibility, completeness, and data quality.
     
-    Steps:
-    1. Use the Financial Document Reader tool to access the document at {file_path}
-    2. Check if the document can be read successfully
-    3. Verify the document contains financial data
-    4. Identify any data quality issues
-    5. Confirm the document is suitable for analysis
-    """,
-    expected_output="""
-    Verification report including:
-    - Document accessibility status (pass/fail)
-    - Data completeness assessment
-    - List of any issues or concerns found
-    - Recommendation on whether to proceed with analysis
-    """,
-    agent=verifier,
-    async_execution=False,
-)
+        Steps:
+        1. Use the Financial Document Reader tool to access the document at {file_path}
+        2. Check if the document can be read successfully
+        3. Verify the document contains financial data
+        4. Identify any data quality issues
+        5. Confirm the document is suitable for analysis
+        """,
+        expected_output="""
+        Verification report including:
+        - Document accessibility status (pass/fail)
+        - Data completeness assessment
+        - List of any issues or concerns found
+        - Recommendation on whether to proceed with analysis
+        """,
+        agent=get_verifier(),
+        async_execution=False,
+    )
 
 ## Creating an investment analysis task
-investment_analysis = Task(
-    description="""
-    Provide investment insights based on the financial document at {file_path} for the query: {query}
+@lru_cache(maxsize=1)
+def get_investment_analysis() -> Task:
+    return Task(
+        description="""
+        Provide investment insights based on the financial document at {file_path} for the query: {query}
+        Verification notes (JSON): {shared_context}
     
-    Steps:
-    1. Use the Financial Document Reader tool to read the document at {file_path}
-    2. Use the Investment Analysis Tool to evaluate investment potential
-    3. Use web search if needed to gather market context
-    4. Assess investment opportunities and risks
-    5. Provide actionable investment recommendations
-    """,
-    expected_output="""
-    Investment analysis report including:
-    - Investment thesis and key opportunities
-    - Risk-return profile assessment
-    - Specific investment recommendations
-    - Important disclaimers about investment risks
-    - Recommendation to consult financial professionals
-    """,
-    agent=investment_advisor,
-    async_execution=False,
-)
+        Steps:
+        1. Use the Financial Document Reader tool to read the document at {file_path}
+        2. Use the Investment Analysis Tool to evaluate investment potential
+        3. Use web search if needed to gather market context
+        4. Assess investment opportunities and risks
+        5. Provide actionable investment recommendations
+        """,
+        expected_output="""
+        Investment analysis report including:
+        - Investment thesis and key opportunities
+        - Risk-return profile assessment
+        - Specific investment recommendations
+        - One line "Recommendation: <Strong Buy|Buy|Hold|Sell|Strong Sell>"
+        - Important disclaimers about investment risks
+        - Recommendation to consult financial professionals
+        """,
+        agent=get_investment_advisor(),
+        async_execution=False,
+    )
 
 ## Creating a risk assessment task
-risk_assessment = Task(
-    description="""
-    Conduct comprehensive risk assessment based on the financial document at {file_path} for the query: {query}
+@lru_cache(maxsize=1)
+def get_risk_assessment() -> Task:
+    return Task(
+        description="""
+        Conduct comprehensive risk assessment based on the financial document at {file_path} for the query: {query}
+        Verification notes (JSON): {shared_context}
     
-    Steps:
-    1. Use the Financial Document Reader tool to read the document at {file_path}
-    2. Use the Risk Assessment Tool to identify and categorize risks
-    3. Use web search if needed for industry risk benchmarks
-    4. Evaluate risk severity and likelihood
-    5. Recommend risk mitigation strategies
-    """,
-    expected_output="""
-    Risk assessment report including:
-    - Comprehensive risk identification and categorization
-    - Risk severity levels (High/Medium/Low)
-    - Detailed risk analysis for each identified risk
-    - Mitigation strategies and recommendations
-    - Monitoring and control recommendations
-    """,
-    agent=risk_assessor,
-    async_execution=False,
-)
+        Steps:
+        1. Use the Financial Document Reader tool to read the document at {file_path}
+        2. Use the Risk Assessment Tool to identify and categorize risks
+        3. Use web search if needed for industry risk benchmarks
+        4. Evaluate risk severity and likelihood
+        5. Recommend risk mitigation strategies
+        """,
+        expected_output="""
+        Risk assessment report including:
+        - Comprehensive risk identification and categorization
+        - Risk severity levels (High/Medium/Low)
+        - Detailed risk analysis for each identified risk
+        - Mitigation strategies and recommendations
+        - Monitoring and control recommendations
+        """,
+        agent=get_risk_assessor(),
+        async_execution=False,
+    )
+
+## Creating a synthesis task that merges the parallel reports
+@lru_cache(maxsize=1)
+def get_synthesis() -> Task:
+    return Task(
+        description="""
+        Combine the specialist reports below into one final report for the query: {query}
+        The analyzed document is {file_path}.
+
+        Verification report:
+        {verification_report}
+
+        Financial analysis report:
+        {financial_report}
+
+        Investment analysis report:
+        {investment_report}
+
+        Risk assessment report:
+        {risk_report}
+
+        Steps:
+        1. Summarize the verification outcome and any data quality caveats
+        2. Merge the financial, investment and risk findings without repeating them
+        3. Resolve or flag any contradictions between the reports
+        4. Answer the user's query directly
+        """,
+        expected_output="""
+        Final financial analysis report including:
+        - Executive summary answering the user's query
+        - Key financial metrics and trends
+        - Investment recommendations with disclaimers
+        - Risk assessment and mitigation strategies
+        - Data quality caveats from verification
+        """,
+        agent=get_synthesizer(),
+        async_execution=False,
+    )
+
+## Map-reduce tasks for documents too large for one prompt
+# Built fresh for each chunk: CrewAI interpolates inputs into a task in place,
+# so one cached task cannot serve several chunks running in parallel.
+def build_chunk_analysis_task() -> Task:
+    return Task(
+        description="""
+        Analyze part {chunk_index} of {chunk_count} of the financial document at {file_path}
+        for the user's query: {query}
+        The text of this part is provided below; do not read the file again.
+
+        Document excerpt:
+        {document_chunk}
+
+        Steps:
+        1. Extract the key financial metrics in this excerpt (revenue, profit, cash flow, debt, etc.)
+        2. Note trends, risks and opportunities relevant to the query
+        3. Keep figures exact and mention the period they refer to
+        """,
+        expected_output="""
+        Concise notes on this excerpt: metrics with figures, trends, risks and opportunities.
+        """,
+        agent=get_financial_analyst(),
+        async_execution=False,
+    )
+
+def build_chunk_reduce_task() -> Task:
+    return Task(
+        description="""
+        The financial document at {file_path} was analyzed in parts. Combine the notes
+        below into one financial analysis for the user's query: {query}
+        Verification notes (JSON): {shared_context}
+
+        Notes per part:
+        {chunk_summaries}
+
+        Steps:
+        1. Merge duplicate metrics and keep the most complete figures
+        2. Identify trends across the parts
+        3. Provide actionable insights, risks and opportunities
+        """,
+        expected_output="""
+        Comprehensive financial analysis report including:
+        - Executive summary of key findings
+        - Analysis of important financial metrics and trends
+        - Insights and strategic recommendations
+        - Identified limitations or data gaps
+        """,
+        agent=get_financial_analyst(),
+        async_execution=False,
+    )
 
 ## Creating a tax analysis task
 tax_analysis = Task(
@@ -119,6 +252,6 @@ tax_analysis = Task(
     - Compliance recommendations
     - Important disclaimers about consulting tax professionals
     """,
-    #agent=tax_analyst,
+    #agent=get_tax_analyst(),
     async_execution=False,
 )
\ No newline at end of file
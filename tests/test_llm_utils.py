@@ -0,0 +1,116 @@
+"""Unit tests for the rate limiter and token windowing in llm_utils.py"""
+import pytest
+
+pytest.importorskip("crewai")
+
+import llm_utils
+from llm_utils import TokenBucket, split_by_tokens, PENALTY_FACTOR, PENALTY_SECONDS
+
+
+class FakeClock:
+    """Stands in for time.monotonic so refills can be stepped exactly."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(llm_utils.time, "monotonic", fake)
+    return fake
+
+
+def test_bucket_starts_full(clock):
+    bucket = TokenBucket(60)
+    assert bucket.reserve(60) == 0.0
+
+
+def test_bucket_wait_covers_the_deficit(clock):
+    bucket = TokenBucket(60)  # Refills one token per second
+    bucket.reserve(60)
+    assert bucket.reserve(30) == pytest.approx(30.0)
+
+
+def test_bucket_refills_linearly(clock):
+    bucket = TokenBucket(60)
+    bucket.reserve(60)
+    clock.now += 15
+    assert bucket.reserve(15) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_bucket_refill_stops_at_capacity(clock):
+    bucket = TokenBucket(60)
+    clock.now += 3600
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_oversized_request_takes_at_most_the_capacity(clock):
+    bucket = TokenBucket(60)
+    assert bucket.reserve(10_000) == 0.0
+    assert bucket.tokens == 0.0
+
+
+def test_penalty_shrinks_then_restores_capacity(clock):
+    bucket = TokenBucket(100)
+    bucket.penalize()
+    assert bucket.capacity == pytest.approx(100 * PENALTY_FACTOR)
+    assert bucket.tokens == pytest.approx(100 * PENALTY_FACTOR)
+
+    # Refill rate follows the shrunken capacity while the penalty lasts
+    bucket.reserve(bucket.tokens)
+    assert bucket.reserve(8) == pytest.approx(8 * 60.0 / (100 * PENALTY_FACTOR))
+
+    clock.now += PENALTY_SECONDS
+    bucket.reserve(0)
+    assert bucket.capacity == 100.0
+    assert bucket.penalty_until == 0.0
+
+
+def test_penalties_compound_but_keep_one_token(clock):
+    bucket = TokenBucket(2)
+    for _ in range(10):
+        bucket.penalize()
+    assert bucket.capacity == 1.0
+
+
+@pytest.fixture
+def char_windows(monkeypatch):
+    # The ~4 characters per token fallback makes window bounds exact
+    monkeypatch.setattr(llm_utils, "TIKTOKEN_AVAILABLE", False)
+
+
+def test_text_that_fits_is_one_window(char_windows):
+    assert split_by_tokens("a" * 40, max_tokens=10) == ["a" * 40]
+
+
+def test_windows_without_overlap_partition_the_text(char_windows):
+    text = "".join(chr(ord("a") + i % 26) for i in range(100))
+    windows = split_by_tokens(text, max_tokens=10)
+    assert [len(w) for w in windows] == [40, 40, 20]
+    assert "".join(windows) == text
+
+
+def test_windows_share_the_overlap(char_windows):
+    text = "".join(chr(ord("a") + i % 26) for i in range(100))
+    windows = split_by_tokens(text, max_tokens=10, overlap=2)
+    for previous, current in zip(windows, windows[1:]):
+        assert previous[-8:] == current[:8]
+    assert windows[-1].endswith(text[-8:])
+    assert len(windows) == 3
+
+
+def test_last_window_is_not_pure_overlap(char_windows):
+    windows = split_by_tokens("x" * 72, max_tokens=10, overlap=2)
+    assert [len(w) for w in windows] == [40, 40]
+
+
+@pytest.mark.parametrize("max_tokens, overlap", [(10, 10), (10, 15), (0, 0), (10, -1)])
+def test_invalid_window_sizes_raise(char_windows, max_tokens, overlap):
+    with pytest.raises(ValueError):
+        split_by_tokens("x" * 1000, max_tokens=max_tokens, overlap=overlap)
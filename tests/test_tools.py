@@ -0,0 +1,67 @@
+"""Every installed KeywordScanner engine must report the same keyword counts"""
+from collections import Counter
+
+import pytest
+
+pytest.importorskip("crewai")
+
+import tools
+from tools import KeywordScanner, FINANCIAL_KEYWORDS, RISK_KEYWORDS
+
+ENGINE_FLAGS = ("HYPERSCAN_AVAILABLE", "AHOCORASICK_AVAILABLE", "NUMBA_AVAILABLE")
+
+# The regex alternation needs no optional dependency, so it is always tested
+ENGINES = [flag for flag in ENGINE_FLAGS if getattr(tools, flag)] + ["regex"]
+
+DOCUMENTS = [
+    "",
+    "No keywords here at all.",
+    "Revenue rose; REVENUE fell. Net LOSS and loss-making units, profit/loss.",
+    "Cash Flow statement, cash  flow (two spaces), balance sheet and income statement.",
+    "debtdebt riskrisk DefaultDefault bankruptcy, contingency; exposure!",
+    "Umsatz – Verlust € 5 Mio. risk of lösses; ümargin, équity and ROI.",
+    # Kelvin sign (U+212A) and dotted capital I only fold to ASCII letters under Unicode rules
+    "RIS\u212a and LIAB\u0130LITY are not keywords",
+    "\n--- Page 1 ---\nThe Company faces volatility, uncertainty and a decline in earnings.\n",
+]
+
+
+def make_scanner(monkeypatch, engine: str, keywords):
+    """KeywordScanner built with only `engine` enabled."""
+    for flag in ENGINE_FLAGS:
+        monkeypatch.setattr(tools, flag, flag == engine)
+    return KeywordScanner(keywords)
+
+
+def expected_counts(text: str, keywords) -> Counter:
+    lowered = text.encode().lower().decode()
+    return Counter({kw: lowered.count(kw) for kw in keywords if kw in lowered})
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("keywords", [FINANCIAL_KEYWORDS, RISK_KEYWORDS], ids=["financial", "risk"])
+@pytest.mark.parametrize("text", DOCUMENTS)
+def test_engine_counts(monkeypatch, engine, keywords, text):
+    scanner = make_scanner(monkeypatch, engine, keywords)
+    assert scanner.counts(text) == expected_counts(text, keywords)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("keywords", [FINANCIAL_KEYWORDS, RISK_KEYWORDS], ids=["financial", "risk"])
+@pytest.mark.parametrize("text", DOCUMENTS)
+def test_engine_presence_matches_counts(monkeypatch, engine, keywords, text):
+    scanner = make_scanner(monkeypatch, engine, keywords)
+    assert scanner.present(text) == set(expected_counts(text, keywords))
+
+
+def test_keyword_sets_have_no_nested_keywords():
+    # Engines only agree on substring counts when no keyword contains another
+    for keywords in (FINANCIAL_KEYWORDS, RISK_KEYWORDS):
+        for keyword in keywords:
+            assert not any(keyword != other and keyword in other for other in keywords)
+
+
+def test_lowercase_reuses_the_copy_for_the_same_object():
+    text = "Revenue " * 10
+    assert tools._lowercase(text) is tools._lowercase(text)
+    assert tools._lowercase("".join(["Revenue "] * 10)) == text.lower()